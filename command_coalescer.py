@@ -0,0 +1,132 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+class CommandCoalescer:
+    """
+    Merges bursts of transport commands before they reach JRiver.
+    "next, next, next" becomes one position change followed by one status
+    fetch, and repeated "volume up" becomes one absolute volume set.
+    """
+
+    def __init__(self, send_command, on_moved=None, window=0.6, volume_step=0.1, settle_time=0.5, playback=None):
+        """
+        Args:
+            send_command (callable): Sends an MCWS command, same signature as
+                VoiceAssistant.send_mcws_command.
+            on_moved (callable): Called once after a burst of moves has been sent.
+            window (float): Seconds to wait for more commands before sending.
+            volume_step (float): Volume change per step (JRiver volume is 0.0-1.0).
+            settle_time (float): Seconds to give JRiver before calling on_moved.
+            playback (PlaybackMonitor): If given, the playback state is read from it and
+                on_moved is called as soon as JRiver has moved (within 4x settle_time).
+        """
+        self.send_command = send_command
+        self.on_moved = on_moved
+        self.window = window
+        self.volume_step = volume_step
+        self.settle_time = settle_time
+        self.playback = playback
+
+        self.pending_move = 0
+        self.pending_volume = 0
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def move(self, delta):
+        """Queues a relative track move (+1 for next, -1 for previous)."""
+        with self.lock:
+            self.pending_move += delta
+            self._schedule()
+
+    def step_volume(self, steps):
+        """Queues volume steps (+1 for up, -1 for down)."""
+        with self.lock:
+            self.pending_volume += steps
+            self._schedule()
+
+    def jump_to(self, position):
+        """Sets the absolute playlist position (0-indexed) right away, dropping queued moves."""
+        with self.lock:
+            self.pending_move = 0
+        return self.send_command("Playback/SetPlaylistPosition", extra_params=f"Position={position}")
+
+    def _schedule(self):
+        """(Re)starts the debounce timer. Caller must hold the lock."""
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.window, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """Sends everything that has been queued as few requests as possible."""
+        with self.lock:
+            delta, volume_steps = self.pending_move, self.pending_volume
+            self.pending_move = 0
+            self.pending_volume = 0
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+
+        if not delta and not volume_steps:
+            return
+        before = self.playback.info if self.playback else None
+
+        if abs(delta) == 1 and not volume_steps:
+            # A single move needs no position lookup
+            self.send_command("Playback/Next" if delta > 0 else "Playback/Previous")
+        else:
+            info = self.playback_info()
+            if info is None:
+                return
+            if delta:
+                self._apply_move(info, delta)
+            if volume_steps:
+                self._apply_volume(info, volume_steps)
+
+        if delta and self.on_moved:
+            if self.playback:
+                playing = (before or {}).get('FileKey')
+                self.playback.wait_for(lambda info: info.get('FileKey') != playing, timeout=4 * self.settle_time)
+            else:
+                time.sleep(self.settle_time)  # Give JRiver a moment to update
+            self.on_moved()
+
+    def playback_info(self):
+        """Fetches Playback/Info as a dict, or None on failure."""
+        if self.playback:
+            # Always fresh: a cached state may predate the last volume or position change
+            return self.playback.refresh()
+        xml_response = self.send_command("Playback/Info", return_xml=True)
+        if not xml_response:
+            return None
+        try:
+            root = ET.fromstring(xml_response)
+        except ET.ParseError:
+            return None
+        return {item.get('Name'): item.text for item in root.findall('Item')}
+
+    def _apply_move(self, info, delta):
+        """Turns a net relative move into a single SetPlaylistPosition."""
+        try:
+            position = int(info.get('PlayingNowPosition') or 0)
+            total = int(info.get('PlayingNowTracks') or 0)
+        except ValueError:
+            return
+        if total == 0:
+            return
+        target = max(0, min(total - 1, position + delta))
+        print(f"⏭️  Coalesced {delta:+d} track move(s): position {position + 1} -> {target + 1}")
+        if target != position:
+            self.send_command("Playback/SetPlaylistPosition", extra_params=f"Position={target}")
+
+    def _apply_volume(self, info, steps):
+        """Turns a net number of volume steps into one absolute volume set."""
+        try:
+            current = float(info.get('Volume') or 0.5)
+        except ValueError:
+            current = 0.5
+        level = max(0.0, min(1.0, current + steps * self.volume_step))
+        print(f"🔊 Coalesced {steps:+d} volume step(s): {current:.2f} -> {level:.2f}")
+        self.send_command("Playback/Volume", extra_params=f"Level={level:.2f}")
@@ -9,7 +9,29 @@ DEFAULTS = {
     "ACCESS_KEY": "",
     "WAKE_WORD": "Alice",
     "VOSK_MODEL_PATH": str(pathlib.Path.home() / "jriver-voice" / "vosk-model-en-us-0.22-lgraph"),
-    "COMMAND_TIMEOUT": 5
+    "COMMAND_TIMEOUT": 5,
+    "MCWS_POOL_SIZE": 4,          # Keep-alive connections to JRiver
+    "MCWS_TIMEOUT": 5,            # Default request timeout (seconds)
+    "MCWS_ENDPOINT_TIMEOUTS": {}, # Per-endpoint overrides, e.g. {"Files/Search": 30}
+    "MCWS_FAILURE_THRESHOLD": 3,  # Connection failures before failing fast
+    "MCWS_PROBE_INTERVAL": 2,     # Seconds between health checks while JRiver is down
+    "ASYNC_MODE": False,          # Run commands on an asyncio pipeline
+    "COALESCE_WINDOW_MS": 600,    # Merge next/previous/volume commands said within this window
+    "LIBRARY_VALUES_PAGE_SIZE": 10000,  # Library values fetched per request (grows if needed)
+    "MCWS_JSON": False,           # Ask JRiver for JSON search results (falls back to XML)
+    "WARM_UP_CACHE": True,        # Fetch the library in the background at startup
+    "LIBRARY_POLL_INTERVAL": 60,  # Seconds between library change checks (0 = off)
+    "INDEX_FILE": str(pathlib.Path.home() / ".cache" / "jriver-voice" / "library.idx"),  # "" = off
+    "TRACK_DB": "",               # Local SQLite track database path ("" = off)
+    "RESOLUTION_CACHE": str(pathlib.Path.home() / ".cache" / "jriver-voice" / "resolutions.json"),  # "" = off
+    "RESOLUTION_CACHE_SIZE": 500,  # Spoken queries remembered with what they played
+    "WARM_UP_TRACK_TITLES": False,  # Index every track title at startup instead of on the first "play the song"
+    "PLAYBACK_POLL_INTERVAL": 5,  # Seconds between playback state checks while playing (0 = only when a command waits)
+    "FILE_INFO_CACHE_SIZE": 5000,  # Tracks whose details are kept for "what's playing"
+    "PLAYLIST_CHUNK_SIZE": 200,   # File keys per request when filling Playing Now
+    "MIX_ENGINE": "local",        # Pick "play random" mixes "local"ly or with "playdoctor"
+    "MIX_SIZE": 100,              # Tracks in a locally picked mix
+    "MIX_SEED": None              # Fixed seed for repeatable mixes (None = different every time)
 }
 
 CONFIG_DIR = pathlib.Path.home() / ".config" / "jriver-voice"
@@ -51,12 +73,22 @@ class Config:
         for key in self._config:
             env_val = os.environ.get(f"JRIVER_{key}") or os.environ.get(key)
             if env_val:
-                # Handle types (int vs string)
-                if isinstance(self._config[key], int):
+                # Handle types (bool vs int vs string); bool first, it is also an int
+                if isinstance(self._config[key], bool):
+                    if env_val.lower() in ("1", "true", "yes", "on"):
+                        self._config[key] = True
+                    elif env_val.lower() in ("0", "false", "no", "off"):
+                        self._config[key] = False
+                elif isinstance(self._config[key], int):
                     try:
                         self._config[key] = int(env_val)
                     except ValueError:
                         pass
+                elif isinstance(self._config[key], dict):
+                    try:
+                        self._config[key] = json.loads(env_val)
+                    except json.JSONDecodeError:
+                        pass
                 else:
                     self._config[key] = env_val
 
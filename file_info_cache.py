@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+class FileInfoCache:
+    """
+    Track fields (Name, Artist, Track #, Disc #, ...) by file key, so saying
+    what's playing doesn't need a File/GetInfo for every track change.
+    Filled in bulk from album searches and Playing Now downloads; the least
+    recently used tracks are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries=5000):
+        """
+        Args:
+            max_entries (int): Maximum number of tracks kept.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Returns the fields of a file key, or None."""
+        with self.lock:
+            fields = self.entries.get(key)
+            if fields is not None:
+                self.entries.move_to_end(key)
+            return fields
+
+    def put(self, key, fields):
+        """Remembers (or adds to) the fields of a file key."""
+        with self.lock:
+            self._put(key, fields)
+            self._evict()
+
+    def update(self, tracks):
+        """Remembers the fields of several tracks (dicts with a Key field) at once."""
+        with self.lock:
+            for fields in tracks:
+                if fields.get('Key'):
+                    self._put(fields['Key'], fields)
+            self._evict()
+
+    def _put(self, key, fields):
+        """Merges fields into the entry for key. Caller must hold the lock."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = dict(fields)
+        else:
+            entry.update(fields)
+            self.entries.move_to_end(key)
+
+    def _evict(self):
+        """Drops the least recently used entries beyond max_entries. Caller must hold the lock."""
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
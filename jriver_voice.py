@@ -9,7 +9,24 @@ import sys
 import difflib
 import urllib.parse
 import time
+import asyncio
+import threading
+import queue
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from config import cfg
+from mcws_client import MCWSClient, AsyncMCWSClient, search_expression, search_phrase_expression, search_params
+from command_coalescer import CommandCoalescer
+from library_watcher import LibraryWatcher
+from playback_monitor import PlaybackMonitor, info_int
+from playing_now import PlayingNow, PLAYLIST_FIELDS, parse_serialized_keys
+from file_info_cache import FileInfoCache
+from playlist_builder import PlaylistBuilder
+from shuffle_engine import ShuffleEngine, MIX_FIELDS, parse_decade
+from library_index import FieldScorer, FieldValues, IndexFile, TrackTitles, search_key, spelled_out
+from resolution_cache import ResolutionCache
+from work_catalog import WorkCatalog, parse_work
+from track_store import TrackStore, TRACK_FIELDS
 
 # --- JRiver Configuration ---
 # Loaded from config.py
@@ -25,6 +42,15 @@ BASE_URL = f"http://{JRIVER_IP}:{JRIVER_PORT}/MCWS/v1/"
 WAKE_WORD = cfg.get("WAKE_WORD")
 # ----------------------------
 
+# Library fields fetched in the background at startup
+WARM_UP_FIELDS = ("Artist", "Composer", "Album", "Genre")
+
+# Files/Search query matching every track (used to fill the local track database)
+ALL_TRACKS_QUERY = "[Media Type]=[Audio]"
+
+# Query the current command is resolving (see VoiceAssistant.pending_resolution)
+PENDING_RESOLUTION = contextvars.ContextVar("pending_resolution", default=None)
+
 class VoiceAssistant:
     """
     Main class for the JRiver Voice Assistant.
@@ -35,185 +61,422 @@ class VoiceAssistant:
     STATE_COMMAND_MODE = 2       # Wake word detected, listening for commands
 
     COMMAND_TIMEOUT = cfg.get("COMMAND_TIMEOUT")  # Seconds to wait for command after wake word
+    GENERIC_FIELDS = ("Artist", "Composer", "Album")  # Fields searched by play_generic
+    MATCH_SHORTLIST = 50  # Candidates the trigram index hands to difflib per lookup
+    PHONETIC_MATCH_SCORE = 0.85  # Score of a near sound-alike match (just below a substring match); the same sound scores 1.0
+    # Mishearings that don't sound enough like the name for phonetic keys to catch
+    MISHEARD_NAMES = {"youtube": "u2", "eighteen seas": "ac dc", "shasta coverage": "shostakovich"}
+    PREFETCH_WORKERS = 4  # Offered albums whose track keys are fetched at once while the choices are spoken
+
+    # Command phrases (shared by the sync and async command paths)
+    NOW_PLAYING_PHRASES = ("what is playing", "what song is this", "what track is this", "what's playing", "what song", "what track")
+    LIST_TRACKS_PHRASES = ("list tracks", "show tracks", "show playlist")
+    GO_TO_TRACK_PHRASES = ("go to track", "jump to track", "play track", "play truck", "play crack", "play black", "play check")
+    SONG_PREFIXES = ("play the song ", "play song ", "find the song ", "find song ")
+    EXPLICIT_SEARCH_PREFIXES = ("play artist", "find artist", "search for artist", "play album", "find album", "search for album", "play random") + SONG_PREFIXES
+    # Words handled earlier in execute_command than the lookups above
+    TRANSPORT_WORDS = ("quit", "exit", "stop", "pause", "next", "previous", "volume", "resume")
 
-    def __init__(self, wake_word=WAKE_WORD):
+    def __init__(self, wake_word=WAKE_WORD, mcws=None):
         """
         Initialize the assistant.
         
         Args:
             wake_word (str): The keyword to activate command mode (default: "Alice").
+            mcws (MCWSClient): Shared MCWS client (default: a new pooled client from config).
         """
+        self.mcws = mcws or create_mcws_client()
+        self.mcws_async = AsyncMCWSClient(self.mcws)
+        self.playback = PlaybackMonitor(self.mcws, interval=cfg.get("PLAYBACK_POLL_INTERVAL"),
+                                        on_error=self.report_mcws_error)
+        self.playlist = PlaylistBuilder(self.send_mcws_command, chunk_size=cfg.get("PLAYLIST_CHUNK_SIZE"))
+        self.file_info = FileInfoCache(cfg.get("FILE_INFO_CACHE_SIZE"))  # Track fields by file key
+        self.playing_now = PlayingNow(self.mcws, self.file_info)  # Local copy of the Playing Now list
+        self.transport = CommandCoalescer(
+            self.send_mcws_command,
+            on_moved=self.what_is_playing_silent,
+            window=cfg.get("COALESCE_WINDOW_MS") / 1000,
+            playback=self.playback
+        )
         self.state = self.STATE_LISTENING
         self.context_items = [] 
         self.current_artist = None
         self.current_field = "Artist"
         self.cache = {} 
+        self.cache_loading = {}  # Field -> Event for fetches in progress
+        self.cache_lock = threading.Lock()
+        self.index_path = cfg.get("INDEX_FILE")  # On-disk library index ("" = off)
+        self.field_scorer = FieldScorer()  # Scores a query against several cached fields at once
+        self.work_catalog = None  # Classical works by number, catalogue number and key
+        self.track_titles = None  # Every track title, built on first use (TrackTitles)
+        self.track_titles_lock = threading.Lock()
+        self.mix_engine = None  # Local random mixes (ShuffleEngine), built on first use
+        self.mix_engine_lock = threading.Lock()
+        self.stale = set()  # Attributes built from the library that changed since (rebuilt on next use)
+        self.resolver = ThreadPoolExecutor(max_workers=len(self.GENERIC_FIELDS), thread_name_prefix="resolve")
+        self.prefetcher = ThreadPoolExecutor(max_workers=self.PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        self.album_prefetch = {}  # Offered album -> Future of its track keys, while a selection is open
+        self.track_store = TrackStore(cfg.get("TRACK_DB")) if cfg.get("TRACK_DB") else None
+        self.resolutions = (ResolutionCache(cfg.get("RESOLUTION_CACHE"), cfg.get("RESOLUTION_CACHE_SIZE"))
+                            if cfg.get("RESOLUTION_CACHE") else None)
+        self.selection_resolution = None  # Pending query of the albums on offer, until one is picked
         self.stream = None  # Initialize stream to None
         self.wake_word = wake_word.lower()  # Store wake word in lowercase
         self.command_mode_start = None  # Track when command mode started
         self.command_queue = None  # Will be set by main()
+        self.speak_lock = threading.Lock()
 
     def speak(self, text):
         """Speaks the text using Piper TTS (British Female) or falls back to espeak-ng."""
-        print(f"🗣️ Speaking: {text}")
+        # Serialize speech: commands may run concurrently in async mode
+        with self.speak_lock:
+            print(f"🗣️ Speaking: {text}")
         
-        # Pause the microphone stream to prevent hearing ourselves
-        if self.stream and self.stream.is_active():
-            self.stream.stop_stream()
-            
-        # Path to Piper model and binary
-        # Look in the source directory (where we downloaded them)
-        base_dir = os.path.expanduser("~/jriver-voice")
-        model_path = os.path.join(base_dir, "piper_voices", "en_GB-cori-high.onnx")
-        piper_binary = os.path.join(base_dir, "piper", "piper")
+            # Pause the microphone stream to prevent hearing ourselves
+            if self.stream and self.stream.is_active():
+                self.stream.stop_stream()
+            
+            # Path to Piper model and binary
+            # Look in the source directory (where we downloaded them)
+            base_dir = os.path.expanduser("~/jriver-voice")
+            model_path = os.path.join(base_dir, "piper_voices", "en_GB-cori-high.onnx")
+            piper_binary = os.path.join(base_dir, "piper", "piper")
         
-        try:
-            # Try using Piper first
-            if os.path.exists(model_path) and os.path.exists(piper_binary):
-                # echo "text" | ./piper/piper --model model.onnx --output-raw | aplay -r 22050 -f S16_LE -t raw -
-                p1 = subprocess.Popen(["echo", text], stdout=subprocess.PIPE)
-                p2 = subprocess.Popen([piper_binary, "--model", model_path, "--output-raw"], stdin=p1.stdout, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                p1.stdout.close()  # Allow p1 to receive a SIGPIPE if p2 exits.
-                subprocess.run(["aplay", "-r", "22050", "-f", "S16_LE", "-t", "raw", "-q"], stdin=p2.stdout, check=False)
-                p2.wait()
-            else:
-                # Fallback to espeak-ng
-                subprocess.run(["espeak-ng", text], check=False)
-                
-        except (FileNotFoundError, subprocess.SubprocessError):
-            # Fallback if piper/aplay not found
             try:
-                subprocess.run(["espeak-ng", text], check=False)
-            except FileNotFoundError:
-                print("⚠️ espeak-ng not found.")
-        finally:
-            # Resume microphone stream
-            if self.stream and self.stream.is_stopped():
+                # Try using Piper first
+                if os.path.exists(model_path) and os.path.exists(piper_binary):
+                    # echo "text" | ./piper/piper --model model.onnx --output-raw | aplay -r 22050 -f S16_LE -t raw -
+                    p1 = subprocess.Popen(["echo", text], stdout=subprocess.PIPE)
+                    p2 = subprocess.Popen([piper_binary, "--model", model_path, "--output-raw"], stdin=p1.stdout, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                    p1.stdout.close()  # Allow p1 to receive a SIGPIPE if p2 exits.
+                    subprocess.run(["aplay", "-r", "22050", "-f", "S16_LE", "-t", "raw", "-q"], stdin=p2.stdout, check=False)
+                    p2.wait()
+                else:
+                    # Fallback to espeak-ng
+                    subprocess.run(["espeak-ng", text], check=False)
+                
+            except (FileNotFoundError, subprocess.SubprocessError):
+                # Fallback if piper/aplay not found
                 try:
-                    self.stream.start_stream()
-                except Exception as e:
-                    print(f"⚠️ Could not restart microphone stream: {e}")
+                    subprocess.run(["espeak-ng", text], check=False)
+                except FileNotFoundError:
+                    print("⚠️ espeak-ng not found.")
+            finally:
+                # Resume microphone stream
+                if self.stream and self.stream.is_stopped():
+                    try:
+                        self.stream.start_stream()
+                    except Exception as e:
+                        print(f"⚠️ Could not restart microphone stream: {e}")
 
     def send_mcws_command(self, command_path, extra_params="", return_xml=False):
-        """Sends a command to JRiver's MCWS API."""
-        url = f"{BASE_URL}{command_path}?Zone=-1&ZoneType=ID&Key={ACCESS_KEY}"
-        if extra_params:
-            url += "&" + extra_params
-            
-        # Retry logic for connection robustness
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, timeout=5)
-                response.raise_for_status() 
-                print(f"✅ Sent MCWS command: {command_path}")
-                
-                if return_xml:
-                    return response.text
-                return response
-                
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ Attempt {attempt + 1}/{max_retries} failed: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)  # Wait 1 second before retrying
-                else:
-                    print(f"❌ Error sending command to JRiver: {e}")
-                    self.speak("I couldn't reach JRiver.")
-                    return None
+        """Sends a command to JRiver's MCWS API through the pooled client."""
+        try:
+            response = self.mcws.get(command_path, extra_params)
+        except requests.exceptions.RequestException as e:
+            self.report_mcws_error(e)
             return None
 
+        if return_xml:
+            return response.text
+        return response
+
+    async def send_mcws_command_async(self, command_path, extra_params="", return_xml=False):
+        """Async version of send_mcws_command for the asyncio pipeline."""
+        try:
+            response = await self.mcws_async.get(command_path, extra_params)
+        except requests.exceptions.RequestException as e:
+            await asyncio.to_thread(self.report_mcws_error, e)
+            return None
+
+        if return_xml:
+            return response.text
+        return response
+
+    def report_mcws_error(self, error):
+        """Logs a failed MCWS request and tells the user (once per outage)."""
+        print(f"❌ Error sending command to JRiver: {error}")
+        # Only announce an outage once, not for every queued command
+        unreachable = isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        if not unreachable or self.mcws.breaker.claim_outage_notice():
+            self.speak("I couldn't reach JRiver.")
+
     def get_all_values(self, field):
-        """Fetches ALL values for a field from JRiver and caches them."""
+        """
+        Fetches ALL values for a field from JRiver and caches them.
+        If the field is already being fetched (e.g. by the startup warm-up),
+        waits for that fetch instead of starting another one.
+        """
         if field in self.cache:
             return self.cache[field]
+        
+        with self.cache_lock:
+            loading = self.cache_loading.get(field)
+            is_loader = loading is None
+            if is_loader:
+                loading = self.cache_loading[field] = threading.Event()
+        
+        if not is_loader:
+            loading.wait()
+            return self.cache.get(field, [])
             
         print(f"📥 Fetching all {field}s from library...")
-        params = f"Field={field}&Limit=10000"
-        xml_response = self.send_mcws_command("Library/Values", extra_params=params, return_xml=True)
-        
         values = []
-        if xml_response:
+        try:
+            values = self.mcws.fetch_values(field, page_size=cfg.get("LIBRARY_VALUES_PAGE_SIZE"))
+            self.store_values(field, values)
+            print(f"   -> Cached {len(values)} {field}s.")
+        except requests.exceptions.RequestException as e:
+            self.report_mcws_error(e)
+        except ET.ParseError:
+            print("❌ Error parsing XML.")
+        finally:
+            with self.cache_lock:
+                del self.cache_loading[field]
+            loading.set()
+        
+        return self.cache.get(field, [])
+
+    def store_values(self, field, values, build_index=True):
+        """
+        Puts a freshly fetched value list into the cache, with precomputed search keys
+        and the match index built over them.
+        The list is swapped in whole, so lookups see either the old or the new list, never a partial one.
+        With build_index=False the index is left for the caller to build (see index_values);
+        lookups scan the keys until then.
+        """
+        if not isinstance(values, FieldValues):
+            values = FieldValues.from_values(values)
+        if build_index:
+            values.build_index()
+        self.cache[field] = values
+        if build_index and field == "Album":
+            self.update_work_catalog()
+
+    def index_values(self, fields):
+        """Builds the match index of cached value lists that were stored without one."""
+        for field, values in fields.items():
+            values.build_index()
+            if field == "Album" and self.cache.get("Album") is values:
+                self.update_work_catalog()
+        print("📚 Library index ready.")
+
+    def load_index_file(self, revision):
+        """
+        Memory-maps the on-disk library index if it matches the library revision.
+        Returns True if the cache was filled from it.
+        The match index over the mapped values is built in the background, so
+        startup doesn't wait for it; until it's ready lookups scan the keys.
+        """
+        index_file = IndexFile(self.index_path)
+        if not index_file.open():
+            return False
+        if revision is None or index_file.revision != revision:
+            print("📚 Library index is out of date, it will be rebuilt.")
+            index_file.close()
+            return False
+        for field, values in index_file.fields.items():
+            self.store_values(field, values, build_index=False)
+        print(f"📚 Loaded library index: {', '.join(f'{len(v)} {f}s' for f, v in index_file.fields.items())}")
+        threading.Thread(target=self.index_values, args=(dict(index_file.fields),), daemon=True, name="library-index").start()
+        return True
+
+    def save_index_file(self, revision):
+        """Writes the cached fields to the on-disk library index."""
+        if revision is None or not self.cache:
+            return
+        try:
+            IndexFile.write(self.index_path, dict(self.cache), revision)
+            print(f"💾 Saved library index to {self.index_path}")
+        except OSError as e:
+            print(f"⚠️ Couldn't save library index: {e}")
+
+    def refresh_cache(self, revision=None):
+        """
+        Re-fetches every cached field and swaps in the ones that changed.
+        Runs in the background; lookups keep using the old lists until then.
+        """
+        changed = False
+        complete = True
+        for field in list(self.cache):
             try:
-                root = ET.fromstring(xml_response)
-                values = [item.text for item in root.findall('Item') if item.text]
-                self.cache[field] = values
-                print(f"   -> Cached {len(values)} {field}s.")
-            except ET.ParseError:
-                print("❌ Error parsing XML.")
+                values = self.mcws.fetch_values(field, page_size=cfg.get("LIBRARY_VALUES_PAGE_SIZE"))
+            except (requests.exceptions.RequestException, ET.ParseError) as e:
+                print(f"⚠️ Couldn't refresh {field}s: {e}")
+                complete = False
+                continue
+            if values != list(self.cache.get(field, [])):
+                self.store_values(field, values)
+                changed = True
+                print(f"   -> Refreshed {len(values)} {field}s.")
+        
+        # Saved even if nothing changed, so the file carries the new revision
+        # and the next start can use it (unless a field couldn't be checked)
+        if complete and self.index_path:
+            self.save_index_file(revision)
+        
+        if self.resolutions:
+            # Remembered albums and artists' album lists only go stale if the
+            # values changed; without the album list cached, that can't be told
+            self.resolutions.check_revision(revision, changed=changed or "Album" not in self.cache)
+        
+        # The track database is the one bulk export per change; the title
+        # index and mix engine are rebuilt from it (or their own export) on next use
+        if self.track_store:
+            self.sync_track_store(revision)
+        self.stale.update(("track_titles", "mix_engine"))
+
+    def update_work_catalog(self):
+        """Rebuilds the classical work index from album titles, and track titles if the track database has them."""
+        tracks = self.track_store.work_titles() if self.track_store and self.track_store.is_ready() else []
+        self.work_catalog = WorkCatalog(self.cache.get("Album", []), tracks)
+        print(f"   -> Indexed {len(self.work_catalog)} albums of classical works.")
+
+    def sync_track_store(self, revision):
+        """Re-fills the local track mirror from JRiver in one bulk search."""
+        print("📥 Syncing local track database...")
+        params = search_params(ALL_TRACKS_QUERY, fields=list(TRACK_FIELDS))
+        try:
+            count = self.track_store.sync(self.mcws.iter_search(params), revision)
+            print(f"   -> Synced {count} tracks.")
+            if "Album" in self.cache:
+                self.update_work_catalog()
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"⚠️ Couldn't sync track database: {e}")
+
+    def build_shared(self, attribute, lock, build):
+        """
+        Returns self.<attribute>, building it with build() on first use, or
+        again if the library changed since (attribute in self.stale). Building
+        happens inside one locked section, so threads asking at the same time
+        build it once. If build() fails it returns None and the attribute is
+        left as it was, so the next call tries again.
+        """
+        if getattr(self, attribute) is not None and attribute not in self.stale:
+            return getattr(self, attribute)
+        with lock:
+            if getattr(self, attribute) is None or attribute in self.stale:
+                # Cleared first, so a library change during the build marks it stale again
+                was_stale = attribute in self.stale
+                self.stale.discard(attribute)
+                built = build()
+                if built is not None:
+                    setattr(self, attribute, built)
+                elif was_stale:
+                    self.stale.add(attribute)
+            return getattr(self, attribute)
+
+    def build_track_titles(self):
+        """
+        Builds the track title index, from the local track database if it has
+        been synced, otherwise from one bulk search. Returns None if the search fails.
+        """
+        print("📥 Indexing track titles...")
+        try:
+            if self.track_store and self.track_store.is_ready():
+                rows = self.track_store.track_titles()
+            else:
+                params = search_params(ALL_TRACKS_QUERY, fields=["Key", "Name", "Artist"])
+                rows = ((track.get("Key"), track.get("Name"), track.get("Artist")) for track in self.mcws.iter_search(params))
+            titles = TrackTitles(rows)
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"⚠️ Couldn't index track titles: {e}")
+            return None
+        print(f"   -> Indexed {len(titles)} track titles.")
+        return titles
+
+    def get_track_titles(self):
+        """Returns the track title index, building it on first use (None if it can't be read)."""
+        return self.build_shared("track_titles", self.track_titles_lock, self.build_track_titles)
+
+    def build_mix_engine(self):
+        """
+        Builds the local mix engine from the local track database if it has
+        been synced, otherwise from one bulk search of artist, album, genre,
+        date and rating. Returns None if the search fails.
+        """
+        print("📥 Reading tracks for random mixes...")
+        try:
+            if self.track_store and self.track_store.is_ready():
+                tracks = self.track_store.mix_tracks()
+            else:
+                tracks = self.mcws.iter_search(search_params(ALL_TRACKS_QUERY, fields=MIX_FIELDS))
+            engine = ShuffleEngine(tracks)
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"⚠️ Couldn't read tracks for random mixes: {e}")
+            return None
+        print(f"   -> {len(engine)} tracks available for mixes.")
+        return engine
+
+    def get_mix_engine(self):
+        """Returns the local mix engine, building it on first use (None if it can't be read)."""
+        return self.build_shared("mix_engine", self.mix_engine_lock, self.build_mix_engine)
+
+    def warm_up_cache(self, fields=WARM_UP_FIELDS, on_done=None):
+        """
+        Fetches the given fields concurrently in the background.
+        Returns immediately; lookups that need a field still loading wait only for that field.
+        on_done is called (on a background thread) once every field has been fetched.
+        """
+        print(f"🔥 Warming up library cache: {', '.join(fields)}")
+        executor = ThreadPoolExecutor(max_workers=len(fields), thread_name_prefix="warm-up")
+        futures = [executor.submit(self.get_all_values, field) for field in fields]
+        executor.shutdown(wait=False)
         
-        return values
+        if on_done:
+            def wait_for_fields():
+                wait(futures)
+                on_done()
+            threading.Thread(target=wait_for_fields, daemon=True).start()
+
+    def search_files(self, params):
+        """
+        Streams Files/Search results as dicts of field name -> value.
+        Stops early (and reports the problem) if the search fails.
+        """
+        try:
+            yield from self.mcws.iter_search(params)
+        except requests.exceptions.RequestException as e:
+            self.report_mcws_error(e)
+        except ET.ParseError:
+            print("❌ Error parsing XML.")
 
     def normalize_text(self, text):
-        """Normalizes spoken text to match library conventions."""
+        """
+        Normalizes spoken text to match library conventions, folded the same
+        way as the library's search keys ("symphony number nine" -> "symphony no 9").
+        """
         text = text.lower()
         replacements = {
-            "number one": "no. 1", "number two": "no. 2", "number three": "no. 3",
-            "number four": "no. 4", "number five": "no. 5", "number six": "no. 6",
-            "number seven": "no. 7", "number eight": "no. 8", "number nine": "no. 9",
-            "number 1": "no. 1", "number 2": "no. 2", "number 3": "no. 3",
-            "number 4": "no. 4", "number 5": "no. 5", "number 6": "no. 6",
-            "number 7": "no. 7", "number 8": "no. 8", "number 9": "no. 9",
-            " op ": " op. ", " opus ": " op. ",
+            "number one": "number 1", "number two": "number 2", "number three": "number 3",
+            "number four": "number 4", "number five": "number 5", "number six": "number 6",
+            "number seven": "number 7", "number eight": "number 8", "number nine": "number 9",
             "simply": "symphony" 
         }
         for k, v in replacements.items():
             text = text.replace(k, v)
-        return text
+        return search_key(text)
 
-    def find_best_match(self, search_term, field="Artist"):
+    def find_best_match(self, search_term, field="Artist", shortlist=None):
         """
-        Uses difflib to find the best fuzzy match.
+        Finds the best fuzzy match. The field's trigram index narrows the
+        library down to a shortlist, which difflib then scores; names that
+        were misheard are recovered from the field's phonetic keys.
+        A shortlist already computed by rank_fields can be passed in.
         Returns (matched_value, score).
         """
         all_values = self.get_all_values(field)
         if not all_values:
             return None, 0
-        
-        # Phonetic aliases for common artist names that sound different
-        # Map common misrecognitions to correct names
-        phonetic_aliases = {
-            # U2
-            "you too": "U2",
-            "u two": "U2",
-            "you two": "U2",
-            "youtube": "U2",
-            "a c d c": "AC/DC",
-            "eighteen seas": "AC/DC",
-            "ac dc": "AC/DC",
-            "acdc": "AC/DC",
-            
-            # Medieval Baebes
-            "maybe evil babes": "Mediaeval Baebes",
-            "medieval babes": "Mediaeval Baebes",
-            "many evil babes": "Mediaeval Baebes",
-            "medieval babies": "Mediaeval Baebes",
-            "mediaeval babes": "Mediaeval Baebes",
-
-            # Russian/Foreign Composers
-            "muzzle sky": "Mussorgsky",
-            "muscle ski": "Mussorgsky",
-            "rock man enough": "Rachmaninoff",
-            "shasta coverage": "Shostakovich",
-            "show stock of it": "Shostakovich",
-            "prokofiev": "Prokofiev",  # Ensure correct spelling
-        }
-        
-        # Check if search term matches a phonetic alias
-        search_lower = search_term.lower()
-        if search_lower in phonetic_aliases:
-            alias_target = phonetic_aliases[search_lower]
-            # Check if the alias exists in the library
-            for v in all_values:
-                if v.lower() == alias_target.lower():
-                    return v, 1.0
             
         # Normalize search term
         search_term = self.normalize_text(search_term)
+        search_term = self.MISHEARD_NAMES.get(search_term, search_term)
             
         # 1. Exact Match
-        for v in all_values:
-            if v.lower() == search_term:
-                return v, 1.0
+        i = all_values.find_exact(search_term)
+        if i is not None:
+            return all_values[i], 1.0
         
         # 2. Substring Match (improved for short queries)
         if len(search_term) <= 4:
@@ -221,229 +484,406 @@ class VoiceAssistant:
             best_word_match = None
             best_word_score = 0
             
-            for v in all_values:
-                words = v.lower().split()
-                for word in words:
-                    # Calculate similarity between search term and this word
-                    similarity = difflib.SequenceMatcher(None, search_term, word).ratio()
-                    if similarity > best_word_score:
-                        best_word_score = similarity
-                        best_word_match = v
+            for word, i in all_values.similar_words(search_term, k=self.MATCH_SHORTLIST):
+                # Calculate similarity between search term and this word
+                similarity = difflib.SequenceMatcher(None, search_term, word).ratio()
+                if similarity > best_word_score:
+                    best_word_score = similarity
+                    best_word_match = all_values[i]
             
             # If we found a very similar standalone word (>0.75), return it
             if best_word_score >= 0.75:
                 return best_word_match, 0.95
         
+        # Values closest to the query, scored by shared trigrams
+        if shortlist is None:
+            shortlist = all_values.similar(search_term, k=self.MATCH_SHORTLIST)
+
         # Regular substring match
-        substring_matches = [v for v in all_values if search_term in v.lower()]
-        if substring_matches:
-            best_sub = difflib.get_close_matches(search_term, substring_matches, n=1, cutoff=0.0)
-            if best_sub:
-                return best_sub[0], 0.9
-
-        # 3. Fuzzy Match
-        matches = difflib.get_close_matches(search_term, all_values, n=1, cutoff=0.6)
-        if matches:
-            score = difflib.SequenceMatcher(None, search_term, matches[0].lower()).ratio()
-            return matches[0], score
-            
-        return None, 0
+        positions = all_values.containing(search_term)
+        if positions is None:
+            # Too short for the trigram index to narrow down
+            positions = [i for i, key in enumerate(all_values.keys) if search_term in key]
+        if len(positions) > self.MATCH_SHORTLIST:
+            # Score only the values closest to the query
+            closest = {i for i, _ in shortlist}
+            positions = [i for i in positions if i in closest] or positions[:self.MATCH_SHORTLIST]
+        if positions:
+            best_sub = max(positions, key=lambda i: difflib.SequenceMatcher(None, search_term, all_values.keys[i]).ratio())
+            return all_values[best_sub], 0.9
+
+        # 3. Fuzzy Match (scored against the values sharing the most trigrams)
+        best_match, best_score = None, 0
+        for i, _ in shortlist:
+            score = difflib.SequenceMatcher(None, search_term, all_values.keys[i]).ratio()
+            if score >= 0.6 and score > best_score:
+                best_match, best_score = all_values[i], score
+
+        # 4. Sound-alike Match, for misrecognized names ("muscle ski" -> Mussorgsky)
+        sound_alikes = all_values.sounds_like(search_term)
+        if sound_alikes:
+            # Several values can share a sound, prefer the one spelled most like the query
+            spelled = spelled_out(search_term)
+            i, similarity = max(sound_alikes, key=lambda match: (
+                match[1], difflib.SequenceMatcher(None, spelled, spelled_out(all_values[match[0]])).ratio()))
+            score = 1.0 if similarity == 1.0 else self.PHONETIC_MATCH_SCORE
+            if score > best_score:
+                print(f"   -> '{search_term}' sounds like '{all_values[i]}'")
+                return all_values[i], score
+            
+        return best_match, best_score
+
+    def rank_fields(self, query, fields, k=None):
+        """
+        Scores a query against the values of several fields at once.
+        Returns a dict of field name -> up to k (position, similarity) pairs, best first.
+        """
+        values = {field: self.get_all_values(field) for field in fields}
+        values = {field: v for field, v in values.items() if v}
+        return self.field_scorer.rank(values, self.normalize_text(query), k or self.MATCH_SHORTLIST)
+
+    def find_best_matches(self, query, fields):
+        """
+        Runs find_best_match for several fields. Cached fields are scored
+        together in one pass; fields that still have to be downloaded are
+        resolved concurrently, and once an artist or composer matches exactly
+        the rest are not waited for (their downloads still fill the cache).
+        An exact album match still waits, since an exact artist or composer
+        of the same name wins over it.
+        Returns a dict of field name -> (matched_value, score).
+        """
+        def decided():
+            return any(matches[field][1] >= 1.0 for field in ("Artist", "Composer") if field in matches)
+
+        matches = {field: (None, 0) for field in fields}
+        cached = [field for field in fields if field in self.cache]
+        if cached:
+            shortlists = self.rank_fields(query, cached)
+            for field in cached:
+                matches[field] = self.find_best_match(query, field=field, shortlist=shortlists.get(field))
+        
+        missing = [field for field in fields if field not in cached]
+        if not missing or decided():
+            return matches
+        
+        futures = {self.resolver.submit(self.find_best_match, query, field): field for field in missing}
+        for future in as_completed(futures):
+            matches[futures[future]] = future.result()
+            if decided():
+                print(f"   -> Exact {futures[future]} match, not waiting for the other fields.")
+                for other in futures:
+                    other.cancel()
+                break
+        return matches
 
     def play_doctor(self, seed, show_track=True):
         """Plays using Play Doctor with a seed, forcing sequential playback."""
         encoded_seed = urllib.parse.quote(seed)
         params = f"Seed={encoded_seed}&Radio=0"
+        self.playlist.replace()  # Stops appending an earlier album
         self.send_mcws_command("Playback/PlayDoctor", extra_params=params)
         
-        # Wait a moment for playback to start, then show what's playing
+        # Wait (up to 5 seconds) for the playlist to populate, then show what's playing
         if show_track:
-            import time
-            # Poll for up to 5 seconds for the playlist to populate
-            for _ in range(10):
-                time.sleep(0.5)
-                # Check if playlist is ready
-                xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-                if xml_response:
-                    try:
-                        root = ET.fromstring(xml_response)
-                        total_tracks = int(root.find(".//Item[@Name='PlayingNowTracks']").text or 0)
-                        if total_tracks > 0:
-                            break
-                    except:
-                        pass
-            
+            self.wait_for_playlist()
             self.what_is_playing_silent()
 
-    def go_to_track(self, track_number):
-        """Goes to a specific track number in the current playlist."""
-        print(f"Attempting to go to track {track_number}")
-        
-        # JRiver's Playback/SetPlaylistPosition is 0-indexed
-        target_position = track_number - 1 
-        
-        # Send the command
-        self.send_mcws_command("Playback/SetPlaylistPosition", extra_params=f"Position={target_position}")
-        
-        # Give JRiver a moment to process and update its state
-        import time
-        time.sleep(0.5) 
-        
-        # Provide feedback
-        # Poll for up to 5 seconds for the playlist to populate
-        for _ in range(10):
-            time.sleep(0.5)
-            # Check if playlist is ready
-            xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-            if xml_response:
-                try:
-                    root = ET.fromstring(xml_response)
-                    total_tracks = int(root.find(".//Item[@Name='PlayingNowTracks']").text or 0)
-                    if total_tracks > 0:
-                        # Wait a moment for JRiver to update
-                        time.sleep(1.0)
-                        
-                        # Get updated status to confirm position
-                        xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-                        if xml_response:
-                            try:
-                                root = ET.fromstring(xml_response)
-                                info = {}
-                                for item in root.findall('Item'):
-                                    info[item.get('Name')] = item.text
-                                
-                                new_pos = int(info.get('PlayingNowPosition', 0)) + 1 # 0-indexed in API
-                                
-                                # Call what_is_playing_silent but override the track number announcement
-                                # to ensure it matches the playlist position we just navigated to
-                                self.what_is_playing_silent(force_track_num=new_pos)
-                            except:
-                                self.what_is_playing_silent()
-                        else:
-                            self.what_is_playing_silent()
-                        return
-                except:
-                    pass
-
     def play_precise_album(self, album_name):
         """Plays exactly the tracks of an album in order."""
         # Note: speak is done by caller to avoid duplicates
         
-        # 1. Search for files in this album
-        import urllib.parse
-        import re
+        # 1. Search for files in this album (unless it was fetched while it was offered)
+        keys = self.prefetched_album_keys(album_name) or self.find_album_track_keys(album_name)
         
-        # Try bracket syntax (proper JRiver search format)
-        queries_to_try = [f"[Album]=[{album_name}]"]
+        if not keys:
+            self.speak("I couldn't find the album tracks. The album name might have special characters that are difficult to search for.")
+            return
+            
+        print(f"Found {len(keys)} tracks for album {album_name}, sorted by track number")
         
-        xml_response = None
-        for i, q in enumerate(queries_to_try):
-            print(f"Trying album search query ({i+1}/{len(queries_to_try)}): {q}")
-            encoded_query = urllib.parse.quote(q)
-            # NOTE: Don't add Action=XML - it causes 500 errors!
-            temp_response = self.send_mcws_command("Files/Search", extra_params=f"Query={encoded_query}", return_xml=True)
-            if temp_response:
-                # Check if we actually got results (not just an empty response)
-                try:
-                    import xml.etree.ElementTree as ET
-                    root = ET.fromstring(temp_response)
-                    items = root.findall('Item')
-                    if len(items) > 0:
-                        print(f"✅ Found {len(items)} tracks with query: {q}")
-                        xml_response = temp_response
-                        break
-                    else:
-                        print(f"⚠️  Query returned 0 results, trying next...")
-                except:
-                    # If we can't parse it, something's wrong, try next query
-                    print(f"⚠️  Query returned invalid XML, trying next...")
-                    pass
+        # 2. Play these keys (PlayByKey replaces Playing Now)
+        if self.play_keys(keys):
+            self.remember_resolution("Album", album_name, keys)
+
+    def play_keys(self, keys):
+        """Replaces Playing Now with the given file keys and shows what's playing. Returns True on success."""
+        # Big box sets go in chunks, playback starts with the first one
+        if not self.playlist.play(keys):
+            return False
         
+        # Show what's playing once JRiver has switched to the new tracks
+        self.wait_for_keys(keys)
+        self.what_is_playing_silent()
+        return True
+
+    def wait_for_playlist(self, timeout=5.0):
+        """Waits until Playing Now has tracks. Returns the playback state, or None on timeout."""
+        return self.playback.wait_for(lambda info: info_int(info, 'PlayingNowTracks') > 0, timeout)
+
+    def wait_for_keys(self, keys, timeout=3.0):
+        """Waits until one of the given file keys is playing. Returns the playback state, or None on timeout."""
+        keys = set(keys)
+        return self.playback.wait_for(lambda info: info.get('FileKey') in keys, timeout)
+
+    async def play_precise_album_async(self, album_name, announcement=None):
+        """
+        Async version of play_precise_album. The announcement (if any) is
+        spoken while the album's tracks are looked up.
+        """
+        # Streaming and parsing a big box set is blocking work, keep it off the event loop
+        find_keys = asyncio.to_thread(
+            lambda: self.prefetched_album_keys(album_name) or self.find_album_track_keys(album_name))
+        if announcement:
+            _, keys = await asyncio.gather(asyncio.to_thread(self.speak, announcement), find_keys)
+        else:
+            keys = await find_keys
         
-        if not xml_response:
-            self.speak("I couldn't find the album tracks. The album name might have special characters that are difficult to search for.")
+        if not keys:
+            await asyncio.to_thread(self.speak, "I couldn't find the album tracks. The album name might have special characters that are difficult to search for.")
             return
             
-        try:
-            root = ET.fromstring(xml_response)
-            tracks = []  # Store (track_num, key) tuples
-            
-            # Find all Items and collect track number + key
-            for item in root.findall('Item'):
-                track_num = None
-                key = None
-                
-                for field in item.findall('Field'):
-                    field_name = field.get('Name')
-                    if field_name == 'Track #':
-                        try:
-                            track_num = int(field.text)
-                        except:
-                            track_num = 9999  # Put invalid tracks at end
-                    elif field_name == 'Key':
-                        key = field.text
-                
-                if key:
-                    # Default to 9999 if no track number found
-                    if track_num is None:
-                        track_num = 9999
-                    tracks.append((track_num, key))
-            
-            if not tracks:
-                self.speak("No tracks found for this album.")
-                return
-            
-            # Sort by track number
-            tracks.sort(key=lambda x: x[0])
-            keys = [key for _, key in tracks]
-                
-            print(f"Found {len(keys)} tracks for album {album_name}, sorted by track number")
-            
-            # 2. Play these keys
-            # Join keys with commas (or semicolons? WSDL says "Play a file (or files) by database key")
-            # Usually comma or semicolon separated. Let's try comma first.
-            keys_str = ",".join(keys)
-            
-            # Playback/PlayByKey
-            # We might need to clear the playlist first? PlayByKey usually replaces Playing Now.
-            self.send_mcws_command("Playback/PlayByKey", extra_params=f"Key={keys_str}")
-            
-            # 3. Show what's playing
-            import time
-            time.sleep(1)
-            self.what_is_playing_silent()
-            
-        except Exception as e:
-            print(f"Error in play_precise_album: {e}")
-            self.speak("Something went wrong playing the album.")
+        print(f"Found {len(keys)} tracks for album {album_name}, sorted by track number")
+        if await asyncio.to_thread(self.play_keys, keys):
+            self.remember_resolution("Album", album_name, keys)
+
+    def find_album_track_keys(self, album_name):
+        """
+        Searches for the tracks of an album and returns their file keys
+        sorted by disc and track number. Returns an empty list if there is nothing playable.
+        """
+        if self.track_store and self.track_store.is_ready():
+            album_tracks = self.track_store.album_tracks(album_name)
+            if album_tracks:
+                # Saying what's playing won't need to look these tracks up
+                self.file_info.update(album_tracks)
+                return [track["Key"] for track in album_tracks]
+        
+        # Bracket syntax is the proper JRiver search format
+        # NOTE: Don't add Action=XML - it causes 500 errors!
+        query = search_expression("Album", album_name)
+        print(f"Trying album search query: {query}")
+        
+        tracks = []  # Store (disc_num, track_num, key) tuples
+        for track in self.search_files(search_params(query, fields=PLAYLIST_FIELDS)):
+            key = track.get('Key')
+            if not key:
+                continue
+            # Saying what's playing won't need to look this track up
+            self.file_info.put(key, track)
+            try:
+                disc_num = int(track.get('Disc #') or 1)
+            except ValueError:
+                disc_num = 1
+            try:
+                track_num = int(track.get('Track #'))
+            except (TypeError, ValueError):
+                track_num = 9999  # Put tracks without a valid number at the end
+            tracks.append((disc_num, track_num, key))
+        
+        # Sort by disc, then track number (keeps box sets in order)
+        tracks.sort(key=lambda x: (x[0], x[1]))
+        return [key for _, _, key in tracks]
+
+    def play_song(self, query):
+        """Plays a single track by title, e.g. "money" or "money by pink floyd"."""
+        titles = self.get_track_titles()
+        if titles is None:
+            self.speak("I couldn't read the track titles from JRiver.")
+            return
+        matches = titles.find(query)
+        # "stand by me" is a title, "money by pink floyd" a title and an artist
+        title, by, artist = query.rpartition(" by ")
+        if by and title and artist and not (matches and matches[0][3] == 1.0):
+            by_artist = titles.find(title, artist)
+            if by_artist and (not matches or by_artist[0][3] >= matches[0][3]):
+                matches = by_artist
+        if not matches or matches[0][3] < 0.6:
+            self.speak(f"I couldn't find the song {query}")
+            return
+        
+        title, artist, key, score = matches[0]
+        print(f"🎵 Song match: {title} by {artist} (key {key}, score {score:.2f})")
+        self.speak(f"Playing {title} by {artist}" if artist else f"Playing {title}")
+        self.play_keys([key])
+
+    def prefetch_album_keys(self, albums):
+        """
+        Starts fetching the track keys of offered albums in the background, so
+        the one picked can be played as soon as it is chosen. Replaces any
+        earlier prefetch.
+        """
+        self.discard_prefetch()
+        if self.track_store and self.track_store.is_ready():
+            return  # Answered locally anyway
+        self.album_prefetch = {album: self.prefetcher.submit(self.find_album_track_keys, album) for album in albums}
+
+    def prefetched_album_keys(self, album):
+        """
+        Returns the prefetched track keys of an album (waiting if the fetch
+        is still running), or None if it wasn't prefetched.
+        """
+        future = self.album_prefetch.pop(album, None)
+        if future is None or future.cancelled():
+            return None
+        keys = future.result()
+        print(f"⚡ Using prefetched tracks for {album}")
+        return keys or None
+
+    def discard_prefetch(self):
+        """Drops prefetched album tracks, cancelling fetches that haven't started."""
+        prefetch, self.album_prefetch = self.album_prefetch, {}
+        for future in prefetch.values():
+            future.cancel()
+
+    def end_selection(self):
+        """Leaves the selection state, forgetting the offered albums."""
+        self.state = self.STATE_LISTENING
+        self.context_items = []
+        self.selection_resolution = None
+        self.discard_prefetch()
 
     def play_album(self, artist, album, field="Artist"):
         """Plays a specific album using precise playback."""
         self.play_precise_album(album)
-        self.state = self.STATE_LISTENING
-        self.context_items = []
+        self.end_selection()
 
     def play_generic(self, query):
         """Tries to find the query as an Artist, Composer, or Album and plays it."""
+        if self.play_remembered(query):
+            return
         self.speak(f"Searching for {query}")
+        self.start_resolution(query)
         
-        # Normalize the query first
+        # Search Artists, Composers and Albums
+        matches = self.find_best_matches(query, self.GENERIC_FIELDS)
+        self.play_best_match(query, matches)
+
+    async def play_generic_async(self, query):
+        """
+        Async version of play_generic: the fields are looked up while speaking,
+        and an album's tracks are looked up while it is announced.
+        """
+        if await asyncio.to_thread(self.play_remembered, query):
+            return
+        self.start_resolution(query)
+        _, matches = await asyncio.gather(
+            asyncio.to_thread(self.speak, f"Searching for {query}"),
+            asyncio.to_thread(self.find_best_matches, query, self.GENERIC_FIELDS)
+        )
+        album, field, score = self.best_of_matches(matches)
+        if field == "Album" and score > 0.8 and not self.is_specific_work(self.normalize_text(query)):
+            print("Scores - " + ", ".join(f"{name}: {value:.2f}" for name, (_, value) in matches.items()))
+            await self.play_precise_album_async(album, announcement=f"Found Album: {album}")
+        else:
+            await asyncio.to_thread(self.play_best_match, query, matches)
+
+    @property
+    def pending_resolution(self):
+        """
+        The query the running command is resolving, waiting for something to
+        play before it is remembered. Kept per command (per asyncio task in
+        async mode), so commands said during a search don't lose its result.
+        """
+        return PENDING_RESOLUTION.get()
+
+    @pending_resolution.setter
+    def pending_resolution(self, value):
+        PENDING_RESOLUTION.set(value)
+
+    def start_resolution(self, query):
+        """Marks a query as being resolved, to be remembered once something plays."""
+        if self.resolutions:
+            self.pending_resolution = {"query": self.normalize_text(query)}
+
+    def remember_resolution(self, field, value, keys=None):
+        """
+        Remembers what the pending query resolved to, now that it played.
+        If the query named an artist or composer, that is remembered
+        rather than the album picked from their list.
+        """
+        pending, self.pending_resolution = self.pending_resolution, None
+        if not pending or not self.resolutions:
+            return
+        entry = pending.get("entity") or {"field": field, "value": value, "keys": keys}
+        self.resolutions.put(pending["query"], entry)
+
+    def play_remembered(self, query):
+        """Plays what the query resolved to last time, if it is remembered. Returns True if it did."""
+        if not self.resolutions:
+            return False
         normalized_query = self.normalize_text(query)
+        entry = self.resolutions.get(normalized_query)
+        if entry and not self.resolutions.is_current(entry):
+            entry = self.recheck_resolution(normalized_query, entry)
+        if not entry:
+            return False
+        print(f"💡 Remembered '{query}' -> {entry['field']}: {entry['value']}")
+        if entry["field"] == "Album":
+            self.speak(f"Playing {entry['value']}")
+            # Falls back to a normal search if the keys no longer play
+            return bool(entry.get("keys")) and self.play_keys(entry["keys"])
+        self.speak(f"Found {entry['field']}: {entry['value']}")
+        self.offer_albums(entry["value"], entry.get("albums", []), field=entry["field"])
+        return True
+
+    def recheck_resolution(self, normalized_query, entry):
+        """
+        Updates an entry learned before the library last changed: the album's
+        track keys (e.g. a second disc was added) or the artist's album list
+        are looked up again. Returns the entry, remembered again, or None if
+        it no longer finds anything.
+        """
+        print(f"💡 Library changed since '{normalized_query}' was remembered, checking it again")
+        if entry["field"] == "Album":
+            entry = dict(entry, keys=self.find_album_track_keys(entry["value"]))
+            found = entry["keys"]
+        else:
+            albums = self.find_albums_by(entry["value"], fields=(entry["field"],), include_album_titles=True)
+            entry = dict(entry, albums=sorted(albums))
+            found = entry["albums"]
+        if not found:
+            return None
+        self.resolutions.put(normalized_query, entry)
+        return entry
+
+    def rank_specific_work(self, normalized_query):
+        """
+        Fallback for works the catalog can't pin down (e.g. "adagio for strings"):
+        the albums closest to the query by shared trigrams that contain key
+        parts of it, best first (at most 5).
+        """
+        all_albums = self.get_all_values("Album")
+        closest = self.rank_fields(normalized_query, ("Album",)).get("Album", [])
+        query_words = [word for word in normalized_query.split() if len(word) > 3]
+        matching_albums = [i for i, _ in closest
+                           if any(word in all_albums.keys[i] for word in query_words)]
         
-        # Check if user is asking for a specific work (symphony, concerto, etc.)
-        specific_work_keywords = ["symphony", "concerto", "sonata", "quartet", "quintet", 
-                                   "no.", "op.", "movement", "adagio", "allegro", "andante"]
-        is_specific_work = any(keyword in normalized_query for keyword in specific_work_keywords)
-        
-        # 1. Search Artists
-        artist, artist_score = self.find_best_match(query, field="Artist")
-        
-        # 2. Search Composers
-        composer, composer_score = self.find_best_match(query, field="Composer")
-        
-        # 3. Search Albums
-        album, album_score = self.find_best_match(query, field="Album")
+        # Score each album with difflib
+        scored_albums = []
+        for i in matching_albums:
+            score = difflib.SequenceMatcher(None, normalized_query, all_albums.keys[i]).ratio()
+            scored_albums.append((all_albums[i], score))
         
-        print(f"Scores - Artist: {artist_score:.2f}, Composer: {composer_score:.2f}, Album: {album_score:.2f}")
+        # Sort by score and take top matches
+        scored_albums.sort(key=lambda x: x[1], reverse=True)
+        return [alb for alb, score in scored_albums[:5] if score > 0.3]
+
+    def is_specific_work(self, normalized_query):
+        """True if the query asks for a specific work (symphony, concerto, Op. 67, ...) rather than an artist or album."""
+        specific_work_keywords = ["symphony", "concerto", "sonata", "quartet", "quintet", 
+                                   "movement", "adagio", "allegro", "andante"]
+        work = parse_work(normalized_query)
+        return (any(keyword in normalized_query for keyword in specific_work_keywords)
+                or bool(work.numbers or work.catalogue))
+
+    def best_of_matches(self, matches):
+        """
+        Picks the best of the Artist/Composer/Album matches.
+        Returns (matched_value, field, score); the value is None if nothing matched.
+        """
+        artist, artist_score = matches["Artist"]
+        composer, composer_score = matches["Composer"]
+        album, album_score = matches["Album"]
         
         best_match = None
         match_type = None
@@ -464,67 +904,69 @@ class VoiceAssistant:
             best_match = album
             match_type = "Album"
         
+        # Special case: if Album score is only slightly higher than Artist/Composer score,
+        # prefer Artist/Composer (e.g., "Mozart" the composer vs "Mozart" the album title)
+        if match_type == "Album" and best_score > 0.8 and max(artist_score, composer_score) > 0.75:
+            score_diff = best_score - max(artist_score, composer_score)
+            if score_diff < 0.15:  # Very close scores
+                # Prefer Artist or Composer
+                if composer_score >= artist_score:
+                    best_match = composer
+                    match_type = "Composer"
+                else:
+                    best_match = artist
+                    match_type = "Artist"
+        
+        return best_match, match_type, best_score
+
+    def play_best_match(self, query, matches):
+        """
+        Plays the best of the Artist/Composer/Album matches for a query.
+        
+        Args:
+            query (str): The spoken query.
+            matches (dict): Field name -> (matched_value, score) from find_best_match.
+        """
+        # Normalize the query first
+        normalized_query = self.normalize_text(query)
+        work = parse_work(normalized_query)
+        print("Scores - " + ", ".join(f"{field}: {score:.2f}" for field, (_, score) in matches.items()))
+        best_match, match_type, best_score = self.best_of_matches(matches)
+        
         # Decision logic for specific works (symphonies, concertos, etc.)
-        if is_specific_work:
-            # Find all albums that might contain this work
-            all_albums = self.get_all_values("Album")
-            
-            # Search for albums matching the normalized query
-            matching_albums = []
-            for alb in all_albums:
-                # Check if the album name contains key parts of the query
-                if any(word in alb.lower() for word in normalized_query.split() if len(word) > 3):
-                    matching_albums.append(alb)
-            
-            # Use difflib for better matching
-            if matching_albums:
-                # Score each album
-                scored_albums = []
-                for alb in matching_albums:
-                    score = difflib.SequenceMatcher(None, normalized_query, alb.lower()).ratio()
-                    scored_albums.append((alb, score))
+        if self.is_specific_work(normalized_query):
+            # Look the work up by composer, number, catalogue number and key
+            self.get_all_values("Album")  # Builds the work catalog on first use
+            top_albums = self.work_catalog.find(normalized_query) if self.work_catalog else []
+            if top_albums:
+                print(f"🎼 Work catalog: {work}")
+            else:
+                top_albums = self.rank_specific_work(normalized_query)
+            
+            if len(top_albums) == 1:
+                # Only one match, play it
+                self.speak(f"Found {top_albums[0]}")
+                self.play_precise_album(top_albums[0])
+            elif len(top_albums) > 1:
+                # Multiple matches - let user choose
+                self.context_items = top_albums
+                self.current_artist = normalized_query  # Store the query for later
+                self.current_field = "SpecificWork"
+                self.state = self.STATE_WAITING_SELECTION
+                self.selection_resolution = self.pending_resolution
                 
-                # Sort by score and take top matches
-                scored_albums.sort(key=lambda x: x[1], reverse=True)
-                top_albums = [alb for alb, score in scored_albums[:5] if score > 0.3]
+                display_albums = top_albums[:5]
+                list_text = ", ".join([f"{i+1}. {album}" for i, album in enumerate(display_albums)])
                 
-                if len(top_albums) == 1:
-                    # Only one match, play it
-                    self.speak(f"Found {top_albums[0]}")
-                    self.play_precise_album(top_albums[0])
-                elif len(top_albums) > 1:
-                    # Multiple matches - let user choose
-                    self.context_items = top_albums
-                    self.current_artist = normalized_query  # Store the query for later
-                    self.current_field = "SpecificWork"
-                    self.state = self.STATE_WAITING_SELECTION
-                    
-                    display_albums = top_albums[:5]
-                    list_text = ", ".join([f"{i+1}. {album}" for i, album in enumerate(display_albums)])
-                    
-                    self.speak(f"I found {len(top_albums)} albums. {list_text}. Which one?")
-                    print(f"Options: {display_albums}")
-                else:
-                    # No good matches, use raw search
-                    self.speak(f"Searching for {normalized_query}.")
-                    self.play_doctor(normalized_query)
-                # No matches found, use raw search
+                # Fetch the choices' tracks while they are read out
+                self.prefetch_album_keys(display_albums)
+                self.speak(f"I found {len(top_albums)} albums. {list_text}. Which one?")
+                print(f"Options: {display_albums}")
+            else:
+                # No good matches, use raw search
                 self.speak(f"Searching for {normalized_query}.")
                 self.play_doctor(normalized_query)
         elif best_match and best_score > 0.8:
-            # Special case: if Album score is only slightly higher than Artist/Composer score,
-            # prefer Artist/Composer (e.g., "Mozart" the composer vs "Mozart" the album title)
-            if match_type == "Album" and max(artist_score, composer_score) > 0.75:
-                score_diff = best_score - max(artist_score, composer_score)
-                if score_diff < 0.15:  # Very close scores
-                    # Prefer Artist or Composer
-                    if composer_score >= artist_score:
-                        best_match = composer
-                        match_type = "Composer"
-                    else:
-                        best_match = artist
-                        match_type = "Artist"
-            
             self.speak(f"Found {match_type}: {best_match}")
             if match_type == "Album":
                 self.play_precise_album(best_match)
@@ -535,108 +977,75 @@ class VoiceAssistant:
             # Iterate through cached artists/composers to see if the query starts with one
             found_combined = False
             found_artist_prefix = None
-            
-            # Use get_all_values to ensure they are loaded
-            potential_artists = self.get_all_values("Artist") + self.get_all_values("Composer")
-            
-            # Sort by length (longest first) to match "London Symphony Orchestra" before "London"
-            potential_artists.sort(key=len, reverse=True)
-            
-            query_lower = normalized_query.lower()
-            
-            for artist in potential_artists:
-                artist_lower = artist.lower()
-                # Check if query starts with this artist
-                if query_lower.startswith(artist_lower):
-                    found_artist_prefix = artist
-                    # Check if there's more text after the artist name
-                    remaining_text = query_lower[len(artist_lower):].strip()
-                    if remaining_text:
-                        # This looks like "Artist Album"
-                        print(f"Potential combined query: Artist='{artist}', Album='{remaining_text}'")
+            found_artist_parts = []
+            
+            # Artists/composers the query starts with, from each field's word trie
+            # (use get_all_values to ensure they are loaded)
+            potential_artists = []
+            for field in ("Artist", "Composer"):
+                values = self.get_all_values(field)
+                if values:
+                    potential_artists.extend((values, i, rest) for i, rest in values.prefixes_of(normalized_query))
+            
+            # Longest first, to match "London Symphony Orchestra" before "London"
+            potential_artists.sort(key=lambda candidate: len(candidate[2]))
+            
+            for values, i, remaining_text in potential_artists:
+                artist = values[i]
+                found_artist_prefix = artist
+                found_artist_parts = values.tokens(i)
+                # Check if there's more text after the artist name
+                if remaining_text:
+                    # This looks like "Artist Album"
+                    print(f"Potential combined query: Artist='{artist}', Album='{remaining_text}'")
+                    
+                    # Search for albums by this artist
+                    # We can't use search_artist_albums directly because it lists ALL albums
+                    # We need to find the specific album matching remaining_text
+                    
+                    # 1. Get all albums by this artist (Artist or Composer)
+                    artist_albums = list(self.find_albums_by(artist, fields=("Artist", "Composer")))
+                    
+                    if artist_albums:
+                        # 2. Find best match for remaining_text in these albums
+                        candidates = []
                         
-                        # Search for albums by this artist
-                        # We can't use search_artist_albums directly because it lists ALL albums
-                        # We need to find the specific album matching remaining_text
+                        for alb in artist_albums:
+                            alb_key = search_key(alb)
+                            # Check for substring match first (common in classical: "Holst: The Planets...")
+                            if remaining_text in alb_key:
+                                # Boost score for substring match
+                                score = 0.9
+                            else:
+                                score = difflib.SequenceMatcher(None, remaining_text, alb_key).ratio()
+                            
+                            if score > 0.5:
+                                candidates.append((alb, score))
                         
-                        # 1. Get all albums by this artist using Files/Search (more reliable)
-                        encoded_artist = urllib.parse.quote(artist)
-                        xml_response = self.send_mcws_command("Files/Search", extra_params=f"Query={encoded_artist}", return_xml=True)
+                        # Sort candidates by score
+                        candidates.sort(key=lambda x: x[1], reverse=True)
                         
-                        artist_albums = []
-                        if xml_response:
-                            try:
-                                root = ET.fromstring(xml_response)
-                                items = root.findall('Item')
-                                
-                                # Collect unique albums from tracks that match this artist
-                                albums_set = set()
-                                for item in items:
-                                    item_artist = None
-                                    item_composer = None
-                                    item_album = None
-                                    
-                                    for field_elem in item.findall('Field'):
-                                        field_name = field_elem.get('Name')
-                                        if field_name == 'Artist':
-                                            item_artist = field_elem.text
-                                        elif field_name == 'Composer':
-                                            item_composer = field_elem.text
-                                        elif field_name == 'Album':
-                                            item_album = field_elem.text
-                                    
-                                    # Check if artist matches (Artist or Composer)
-                                    is_match = False
-                                    if item_artist and artist.lower() in item_artist.lower():
-                                        is_match = True
-                                    elif item_composer and artist.lower() in item_composer.lower():
-                                        is_match = True
-                                        
-                                    if is_match and item_album:
-                                        albums_set.add(item_album)
+                        if candidates:
+                            if len(candidates) == 1:
+                                best_alb = candidates[0][0]
+                                self.speak(f"Found {best_alb} by {artist}")
+                                self.play_precise_album(best_alb)
+                            else:
+                                # Multiple matches - let user choose
+                                top_candidates = [c[0] for c in candidates[:10]]
+                                self.context_items = top_candidates
+                                self.current_artist = artist
+                                self.current_field = "Album"
+                                self.state = self.STATE_WAITING_SELECTION
+                                self.selection_resolution = self.pending_resolution
                                 
-                                artist_albums = list(albums_set)
-                            except:
-                                pass
-                        
-                        if artist_albums:
-                            # 2. Find best match for remaining_text in these albums
-                            candidates = []
-                            
-                            for alb in artist_albums:
-                                # Check for substring match first (common in classical: "Holst: The Planets...")
-                                if remaining_text.lower() in alb.lower():
-                                    # Boost score for substring match
-                                    score = 0.9
-                                else:
-                                    score = difflib.SequenceMatcher(None, remaining_text, alb.lower()).ratio()
+                                list_text = ", ".join([f"{i+1}. {alb}" for i, alb in enumerate(top_candidates)])
+                                self.speak(f"I found {len(candidates)} albums by {artist}. {list_text}. Which one?")
+                                print(f"Options: {top_candidates}")
                                 
-                                if score > 0.5:
-                                    candidates.append((alb, score))
-                            
-                            # Sort candidates by score
-                            candidates.sort(key=lambda x: x[1], reverse=True)
-                            
-                            if candidates:
-                                if len(candidates) == 1:
-                                    best_alb = candidates[0][0]
-                                    self.speak(f"Found {best_alb} by {artist}")
-                                    self.play_precise_album(best_alb)
-                                else:
-                                    # Multiple matches - let user choose
-                                    top_candidates = [c[0] for c in candidates[:10]]
-                                    self.context_items = top_candidates
-                                    self.current_artist = artist
-                                    self.current_field = "Album"
-                                    self.state = self.STATE_WAITING_SELECTION
-                                    
-                                    list_text = ", ".join([f"{i+1}. {alb}" for i, alb in enumerate(top_candidates)])
-                                    self.speak(f"I found {len(candidates)} albums by {artist}. {list_text}. Which one?")
-                                    print(f"Options: {top_candidates}")
-                                    
-                                found_combined = True
-                                break
-            
+                            found_combined = True
+                            break
+        
             # Fallback: If we identified an artist but couldn't find tracks/albums by them
             # (e.g. "Gustav Holst" is in Album title but not in Artist/Composer field)
             if not found_combined and found_artist_prefix:
@@ -647,22 +1056,28 @@ class VoiceAssistant:
                  
                  fallback_candidates = []
                  
-                 for alb in all_albums:
+                 # Albums containing the remaining text
+                 positions = all_albums.containing(remaining_text) if all_albums else []
+                 if positions is None:
+                     positions = [i for i, key in enumerate(all_albums.keys) if remaining_text in key]
+                 
+                 for i in positions:
+                     alb, alb_key = all_albums[i], all_albums.keys[i]
                      # Check if remaining text matches
-                     if remaining_text.lower() in alb.lower():
+                     if remaining_text in alb_key:
                          # Check if artist name (or last name) is in the album title
                          # Split artist name into parts (e.g. "Gustav", "Holst")
-                         artist_parts = found_artist_prefix.lower().split()
+                         artist_parts = found_artist_parts
                          
                          # Check if ANY significant part of the artist name is in the album title
                          # (e.g. "Holst" in "Holst: The Planets")
-                         if any(part in alb.lower() for part in artist_parts if len(part) > 2):
+                         if any(part in alb_key for part in artist_parts if len(part) > 2):
                              # Good candidate
                              # Boost score if remaining text is a substring
-                             if remaining_text.lower() in alb.lower():
+                             if remaining_text in alb_key:
                                  score = 0.9
                              else:
-                                 score = difflib.SequenceMatcher(None, remaining_text, alb.lower()).ratio()
+                                 score = difflib.SequenceMatcher(None, remaining_text, alb_key).ratio()
                                  
                              if score > 0.6:
                                  fallback_candidates.append((alb, score))
@@ -682,6 +1097,7 @@ class VoiceAssistant:
                          self.current_artist = found_artist_prefix
                          self.current_field = "Album"
                          self.state = self.STATE_WAITING_SELECTION
+                         self.selection_resolution = self.pending_resolution
                          
                          list_text = ", ".join([f"{i+1}. {alb}" for i, alb in enumerate(top_candidates)])
                          self.speak(f"I found {len(fallback_candidates)} albums. {list_text}. Which one?")
@@ -693,71 +1109,78 @@ class VoiceAssistant:
                 self.speak(f"I couldn't find an exact match, so I'll search for {normalized_query}.")
                 self.play_doctor(normalized_query)
 
+    def find_albums_by(self, name, fields=("Artist",), include_album_titles=False):
+        """
+        Returns the set of albums with tracks that have name in one of fields
+        (optionally also albums with name in the title).
+        Answered from the local track mirror when there is one, otherwise with a Files/Search.
+        """
+        if self.track_store and self.track_store.is_ready():
+            return self.track_store.albums_by(name, fields, include_album_titles)
+        
+        # Only ask for tracks with the name in those fields (anywhere in the album
+        # title, e.g. "Holst: The Planets"), and only for the fields we need
+        expressions = [search_expression(field, name) for field in fields]
+        if include_album_titles:
+            expressions.append(search_phrase_expression("Album", name))
+        params = search_params(*expressions, fields=list(fields) + ["Album"])
+        
+        needle = search_key(name)
+        albums = set()
+        for track in self.search_files(params):
+            album = track.get('Album')
+            if not album:
+                continue
+            values = [track.get(field) for field in fields]
+            if include_album_titles:
+                values.append(album)
+            if any(value and needle in search_key(value) for value in values):
+                albums.add(album)
+        return albums
+
     def search_artist_albums(self, artist_name, field="Artist"):
         """Searches for albums by the given artist/composer."""
         # JRiver's Library/Values filtering doesn't work reliably
         # Instead, use Files/Search to find tracks by this artist, then get unique albums
         print(f"Searching for albums by {field}: {artist_name}")
         
-        query = urllib.parse.quote(artist_name)
-        xml_response = self.send_mcws_command("Files/Search", extra_params=f"Query={query}", return_xml=True)
+        # Include albums where the artist/composer name is in the respective field,
+        # or in the Album title (common for classical music)
+        albums_set = self.find_albums_by(artist_name, fields=(field,), include_album_titles=True)
         
-        if not xml_response:
-            self.speak(f"I found {artist_name}, but couldn't search for albums.")
-            return
+        albums = sorted(list(albums_set))
+        self.offer_albums(artist_name, albums, field)
 
-        try:
-            root = ET.fromstring(xml_response)
-            items = root.findall('Item')
-            
-            # Collect unique albums from tracks that match this artist
-            albums_set = set()
-            for item in items:
-                item_field_value = None
-                item_album = None
-                
-                for field_elem in item.findall('Field'):
-                    field_name = field_elem.get('Name')
-                    if field_name == field:  # Could be 'Artist' or 'Composer'
-                        item_field_value = field_elem.text
-                    elif field_name == 'Album':
-                        item_album = field_elem.text
-                
-                # Include album if:
-                # 1. The artist/composer name is in the respective field, OR
-                # 2. The artist/composer name is in the Album title (common for classical music)
-                if item_album:
-                    if item_field_value and artist_name.lower() in item_field_value.lower():
-                        albums_set.add(item_album)
-                    elif artist_name.lower() in item_album.lower():
-                        # Also include if artist name is in the album title
-                        albums_set.add(item_album)
-            
-            albums = sorted(list(albums_set))
-            
-            if not albums:
-                self.speak(f"I found {artist_name}, but couldn't find any albums in the library.")
-                return
-
-            if len(albums) == 1:
-                self.play_album(artist_name, albums[0], field)
-            else:
-                self.context_items = albums
-                self.current_artist = artist_name
-                self.current_field = field
-                self.state = self.STATE_WAITING_SELECTION
-                
-                display_albums = albums[:10]
-                list_text = ", ".join([f"{i+1}. {album}" for i, album in enumerate(display_albums)])
-                
-                self.speak(f"I found {len(albums)} albums. {list_text}. Which one?")
-                print(f"Options: {display_albums}")
+    def offer_albums(self, artist_name, albums, field="Artist"):
+        """Plays the artist's only album, or lists their albums to choose from."""
+        if self.pending_resolution and "entity" not in self.pending_resolution:
+            self.pending_resolution["entity"] = {"field": field, "value": artist_name, "albums": albums}
+        
+        if not albums:
+            self.speak(f"I found {artist_name}, but couldn't find any albums in the library.")
+            return
 
-        except ET.ParseError:
-            self.speak("Error reading library data.")
+        if len(albums) == 1:
+            self.play_album(artist_name, albums[0], field)
+        else:
+            self.context_items = albums
+            self.current_artist = artist_name
+            self.current_field = field
+            self.state = self.STATE_WAITING_SELECTION
+            self.selection_resolution = self.pending_resolution
+            
+            display_albums = albums[:10]
+            list_text = ", ".join([f"{i+1}. {album}" for i, album in enumerate(display_albums)])
+            
+            # Fetch the choices' tracks while they are read out
+            self.prefetch_album_keys(display_albums)
+            self.speak(f"I found {len(albums)} albums. {list_text}. Which one?")
+            print(f"Options: {display_albums}")
 
     def handle_selection(self, text):
         """Handles user selection from a list."""
+        # The pick finishes the query that offered the list
+        self.pending_resolution = self.selection_resolution
         # Handle British pronunciations
         british_pronunciations = {
             "for": "four",
@@ -800,66 +1223,24 @@ class VoiceAssistant:
                 # Use precise playback to encourage starting at track 1
                 self.speak(f"Playing {selected_album}")
                 self.play_precise_album(selected_album)
-                self.state = self.STATE_LISTENING
-                self.context_items = []
+                self.end_selection()
             else:
                 # User selected an album from artist/composer search
                 self.play_album(self.current_artist, selected_album, field)
         elif "cancel" in text or "stop" in text:
             self.speak("Selection cancelled.")
-            self.state = self.STATE_LISTENING
-            self.context_items = []
+            self.end_selection()
+            self.pending_resolution = None  # Nothing played, so there is nothing to learn
         else:
             self.speak("Please say a number like one, two, or three.")
 
     def go_to_track(self, track_number):
         """Navigate to a specific track number in the current Playing Now playlist."""
-        # Special case: if requesting track 1, go to the very beginning
-        # (This helps when user wants to start an album from the beginning)
-        if track_number == 1:
-            # Jump to the beginning of the Playing Now playlist
-            xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-            if not xml_response:
-                return
-            
-            try:
-                root = ET.fromstring(xml_response)
-                info = {}
-                for item in root.findall('Item'):
-                    info[item.get('Name')] = item.text
-                
-                current_pos = int(info.get('PlayingNowPosition', 0))
-                
-                if current_pos == 0:
-                    self.speak(f"Already at the beginning.")
-                    # Still show what's playing
-                    self.what_is_playing_silent()
-                    return
-                else:
-                    self.speak(f"Going to the beginning.")
-                    # Go back to position 0
-                    for _ in range(current_pos):
-                        self.send_mcws_command("Playback/Previous")
-                    # Show what's now playing
-                    self.what_is_playing_silent()
-                    return
-                    
-            except Exception as e:
-                print(f"Error: {e}")
-                self.speak("I couldn't go to the beginning.")
-                return
-        
-        # For other track numbers, use relative navigation
-        xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-        if not xml_response:
+        info = self.playback.current()
+        if not info:
             return
         
         try:
-            root = ET.fromstring(xml_response)
-            info = {}
-            for item in root.findall('Item'):
-                info[item.get('Name')] = item.text
-            
             current_pos = int(info.get('PlayingNowPosition', 0))
             total_tracks = int(info.get('PlayingNowTracks', 0))
             
@@ -872,49 +1253,84 @@ class VoiceAssistant:
                 self.speak(f"Track {track_number} is out of range. There are {total_tracks} tracks.")
                 return
             
-            # Calculate how many times to press next/previous
             target_pos = track_number - 1  # 0-indexed
-            offset = target_pos - current_pos
             
-            if offset == 0:
-                self.speak(f"Already on track {track_number}.")
+            if target_pos == current_pos:
+                if track_number == 1:
+                    self.speak(f"Already at the beginning.")
+                else:
+                    self.speak(f"Already on track {track_number}.")
                 self.what_is_playing_silent()
                 return
-            elif offset > 0:
-                # Go forward
-                self.speak(f"Going to track {track_number}.")
-                for _ in range(offset):
-                    self.send_mcws_command("Playback/Next")
-                # Show what's now playing (wait for JRiver to update)
-                import time
-                time.sleep(0.5)
-                self.what_is_playing_silent()
+            
+            # Special case: track 1 means start the album from the beginning
+            if track_number == 1:
+                self.speak(f"Going to the beginning.")
             else:
-                # Go backward
                 self.speak(f"Going to track {track_number}.")
-                for _ in range(abs(offset)):
-                    self.send_mcws_command("Playback/Previous")
-                # Show what's now playing (wait for JRiver to update)
-                import time
-                time.sleep(0.5)
-                self.what_is_playing_silent()
+            
+            # One absolute jump instead of a Next/Previous per track,
+            # checked (and retried once) before showing what's playing
+            if not self.jump_to_position(target_pos):
+                self.speak(f"I couldn't get to track {track_number}.")
+                return
+            self.what_is_playing_silent()
                     
         except Exception as e:
             print(f"Error in go_to_track: {e}")
             self.speak("I couldn't navigate to that track.")
 
+    def jump_to_position(self, position, attempts=2):
+        """Sets the Playing Now position (0-indexed) and waits until JRiver is there. Returns True on success."""
+        at_position = lambda info: info_int(info, 'PlayingNowPosition', -1) == position
+        for _ in range(attempts):
+            if not self.transport.jump_to(position):
+                return False
+            if self.playback.wait_for(at_position, timeout=2.0):
+                return True
+        return False
+
+    def now_playing_fields(self, info):
+        """
+        Returns the fields (Track #, Disc #, ...) of the playing track: from
+        the file info cache (filled by album searches and the Playing Now
+        mirror), the Playing Now mirror itself, or failing that from File/GetInfo.
+        Returns an empty dict if nothing valid is playing.
+        """
+        file_key = info.get('FileKey')
+        if not file_key or file_key == '-1':  # Validate file key before using it
+            return {}
+        fields = self.file_info.get(file_key)
+        if fields and fields.get('Track #') is not None:
+            return fields
+        if self.playing_now.sync(info):
+            fields = self.playing_now.track(file_key)
+            if fields:
+                return fields
+        file_info = self.send_mcws_command("File/GetInfo", extra_params=f"File={file_key}", return_xml=True)
+        fields = self.parse_file_info(file_info)
+        if fields:
+            self.file_info.put(file_key, fields)
+        return fields
+
+    def parse_file_info(self, file_info):
+        """Parses a File/GetInfo response into a dict of field name -> value (empty if unreadable)."""
+        if not file_info:
+            return {}
+        try:
+            file_root = ET.fromstring(file_info)
+        except ET.ParseError:
+            return {}
+        # File/GetInfo returns <Field Name="..."> tags
+        return {field.get('Name'): field.text for field in file_root.findall('.//Field')}
+
     def what_is_playing_silent(self, force_track_num=None):
         """Shows what's playing without speaking (just prints)."""
-        xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-        if not xml_response:
+        info = self.playback.current()
+        if not info:
             return
             
         try:
-            root = ET.fromstring(xml_response)
-            info = {}
-            for item in root.findall('Item'):
-                info[item.get('Name')] = item.text
-            
             name = info.get('Name', 'Unknown Track')
             artist = info.get('Artist', 'Unknown Artist')
             file_key = info.get('FileKey')
@@ -924,19 +1340,8 @@ class VoiceAssistant:
             # Use forced track number if provided (for accurate navigation feedback)
             display_pos = force_track_num if force_track_num is not None else position
             
-            # Get track number from file info
-            track_num = "?"
-            if file_key and file_key != '-1':  # Validate file key before using it
-                file_info = self.send_mcws_command("File/GetInfo", extra_params=f"File={file_key}", return_xml=True)
-                if file_info:
-                    try:
-                        file_root = ET.fromstring(file_info)
-                        for field in file_root.findall('.//Field'):
-                            if field.get('Name') == 'Track #':
-                                track_num = field.text
-                                break
-                    except:
-                        pass
+            # Get track number from the Playing Now mirror
+            track_num = self.now_playing_fields(info).get('Track #') or "?"
             
             print(f"\n🎵 Now Playing (Track {display_pos} of {total}):")
             print(f"   Album Track #: {track_num}")
@@ -948,67 +1353,92 @@ class VoiceAssistant:
 
     def what_is_playing(self):
         """Announces the currently playing track with track number info."""
-        xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-        if not xml_response:
+        info = self.playback.current()
+        if not info:
             return
             
         try:
-            root = ET.fromstring(xml_response)
-            info = {}
-            for item in root.findall('Item'):
-                info[item.get('Name')] = item.text
-            
-            name = info.get('Name', 'Unknown Track')
-            artist = info.get('Artist', 'Unknown Artist')
-            file_key = info.get('FileKey')
-            
-            # Build response
-            response = f"Playing {name} by {artist}"
+            # Track number info comes from the Playing Now mirror
+            self.speak(self.describe_now_playing(info, self.now_playing_fields(info)))
             
-            # Try to get track number info
-            if file_key and file_key != '-1':  # Validate file key before using it
-                file_info = self.send_mcws_command("File/GetInfo", extra_params=f"File={file_key}", return_xml=True)
-                if file_info:
-                    try:
-                        file_root = ET.fromstring(file_info)
-                        # File/GetInfo returns <Field Name="..."> tags
-                        track_num = None
-                        disc_num = None
-                        
-                        for field in file_root.findall('.//Field'):
-                            field_name = field.get('Name')
-                            if field_name == 'Track #':
-                                track_num = field.text
-                            elif field_name == 'Disc #':
-                                disc_num = field.text
-                        
-                        if track_num:
-                            if disc_num and disc_num != '1':
-                                response += f", track {track_num} of disc {disc_num}"
-                            else:
-                                response += f", track {track_num}"
-                    except:
-                        pass
+        except Exception as e:
+            print(f"Error in what_is_playing: {e}")
+            self.speak("I couldn't get playback info.")
+
+    async def playback_and_playlist_async(self):
+        """
+        Returns (playback state, whether the Playing Now mirror is current).
+        If the latest state is too old, Playback/Info and the Playing Now key
+        list are fetched together instead of one after the other.
+        """
+        info, keys = self.playback.cached(), None
+        if info is None:
+            info, serialized = await asyncio.gather(
+                asyncio.to_thread(self.playback.refresh),
+                self.send_mcws_command_async("Playback/Playlist", "Action=Serialize", return_xml=True)
+            )
+            keys = parse_serialized_keys(serialized) if serialized else None
+        if not info:
+            return None, False
+        return info, await asyncio.to_thread(self.playing_now.sync, info, keys)
+
+    async def what_is_playing_async(self):
+        """Async version of what_is_playing."""
+        info, _ = await self.playback_and_playlist_async()
+        if not info:
+            return
             
-            response += "."
-            self.speak(response)
+        try:
+            fields = await asyncio.to_thread(self.now_playing_fields, info)
+            await asyncio.to_thread(self.speak, self.describe_now_playing(info, fields))
             
         except Exception as e:
             print(f"Error in what_is_playing: {e}")
-            self.speak("I couldn't get playback info.")
+            await asyncio.to_thread(self.speak, "I couldn't get playback info.")
+
+    def describe_now_playing(self, info, fields=None):
+        """Builds the spoken now-playing sentence from Playback/Info and the track's fields."""
+        name = info.get('Name', 'Unknown Track')
+        artist = info.get('Artist', 'Unknown Artist')
+        
+        # Build response
+        response = f"Playing {name} by {artist}"
+        
+        fields = fields or {}
+        track_num = fields.get('Track #')
+        disc_num = fields.get('Disc #')
+        if track_num:
+            if disc_num and disc_num != '1':
+                response += f", track {track_num} of disc {disc_num}"
+            else:
+                response += f", track {track_num}"
+        
+        return response + "."
 
     def list_tracks(self):
         """Lists information about the current Playing Now playlist."""
-        xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-        if not xml_response:
+        info = self.playback.current()
+        if not info:
             return
         
+        # The playlist comes from the local mirror, re-read only if it changed
+        tracks = self.playing_now.entries() if self.playing_now.sync(info) else None
+        self.show_track_list(info, tracks)
+
+    async def list_tracks_async(self):
+        """Async version of list_tracks: playback info and the playlist are fetched together."""
+        info, mirrored = await self.playback_and_playlist_async()
+        if not info:
+            return
+        tracks = self.playing_now.entries() if mirrored else None
+        await asyncio.to_thread(self.show_track_list, info, tracks)
+
+    def show_track_list(self, info, tracks):
+        """
+        Prints the Playing Now playlist and speaks the current position.
+        tracks is the fields of each track in order (None if the list couldn't be read).
+        """
         try:
-            root = ET.fromstring(xml_response)
-            info = {}
-            for item in root.findall('Item'):
-                info[item.get('Name')] = item.text
-            
             current_pos = int(info.get('PlayingNowPosition', 0)) + 1  # 1-indexed
             total_tracks = int(info.get('PlayingNowTracks', 0))
             
@@ -1020,36 +1450,17 @@ class VoiceAssistant:
             print(f"\n📋 Playing Now Playlist ({total_tracks} tracks):")
             print(f"   Current position: {current_pos} of {total_tracks}\n")
             
-            # Get the actual playlist
-            playlist_xml = self.send_mcws_command("Playback/Playlist", return_xml=True)
-            if playlist_xml:
-                try:
-                    playlist_root = ET.fromstring(playlist_xml)
-                    tracks = []
-                    for item in playlist_root.findall('Item'):
-                        track_info = {}
-                        for field in item.findall('Field'):
-                            field_name = field.get('Name')
-                            if field_name in ['Name', 'Track #']:
-                                track_info[field_name] = field.text
-                        
-                        track_num = track_info.get('Track #', '?')
-                        track_name = track_info.get('Name', 'Unknown Track')
-                        tracks.append((track_num, track_name))
-                    
-                    # Display tracks (limit to 20 for readability)
-                    display_count = min(20, len(tracks))
-                    for i, (track_num, track_name) in enumerate(tracks[:display_count], 1):
-                        marker = "▶" if i == current_pos else " "
-                        print(f"   {marker} {i}. {track_name}")
-                    
-                    if len(tracks) > display_count:
-                        print(f"\n   ... and {len(tracks) - display_count} more tracks")
-                    
-                    print(f"\n   Say 'play track [number]' to jump to any track\n")
-                    
-                except Exception as e:
-                    print(f"   Error parsing playlist: {e}\n")
+            if tracks is not None:
+                # Display tracks (limit to 20 for readability)
+                display_count = min(20, len(tracks))
+                for i, track in enumerate(tracks[:display_count], 1):
+                    marker = "▶" if i == current_pos else " "
+                    print(f"   {marker} {i}. {track.get('Name') or 'Unknown Track'}")
+                
+                if len(tracks) > display_count:
+                    print(f"\n   ... and {len(tracks) - display_count} more tracks")
+                
+                print(f"\n   Say 'play track [number]' to jump to any track\n")
             
             self.speak(f"There are {total_tracks} tracks in the playlist. You're at position {current_pos}.")
             
@@ -1057,8 +1468,68 @@ class VoiceAssistant:
             print(f"Error listing tracks: {e}")
             self.speak("I couldn't get playlist info.")
 
+    def play_random(self, what=""):
+        """
+        Plays a random mix of everything, or of a decade, genre or artists
+        ("pink floyd and u2"). Mixes are picked locally unless MIX_ENGINE is
+        "playdoctor"; decades and artists are always picked locally.
+        """
+        if not what:
+            if not self.play_mix("random music"):
+                self.speak("Playing random music.")
+                self.playlist.replace()  # Stops appending an earlier album
+                self.send_mcws_command("Playback/PlayDoctor")
+                self.wait_for_playlist()
+                self.what_is_playing_silent()
+            return
+        
+        decade = parse_decade(what)
+        if decade:
+            if not self.play_mix(f"random music from the {decade}s", decade=decade, always=True):
+                self.speak("I couldn't pick a random mix from your library.")
+            return
+        
+        if self.play_random_genre(what):
+            return
+        
+        # Not a genre: an artist, or several joined with "and"
+        artists = []
+        for name in what.split(" and "):
+            artist, score = self.find_best_match(name, "Artist")
+            if not artist or score < 0.8:
+                self.speak(f"I couldn't find a genre or artist named {what}.")
+                return
+            artists.append(artist)
+        if not self.play_mix(f"random {' and '.join(artists)}", artists=artists, always=True):
+            self.speak("I couldn't pick a random mix from your library.")
+
+    def play_mix(self, description, genre=None, decade=None, artists=None, always=False):
+        """
+        Plays a locally picked mix (MIX_SIZE tracks, seeded with MIX_SEED if set)
+        with one PlayByKey. Returns False without playing anything if the
+        local engine is off (unless always) or has no tracks, so Play Doctor
+        can be used instead.
+        """
+        if cfg.get("MIX_ENGINE") != "local" and not always:
+            return False
+        engine = self.get_mix_engine()
+        if engine is None or not len(engine):
+            return False
+        positions = engine.select(genre=genre, decade=decade, artists=artists)
+        if not positions:
+            self.speak(f"I couldn't find any tracks for {description}.")
+            return True
+        keys = engine.mix(positions, size=cfg.get("MIX_SIZE"), seed=cfg.get("MIX_SEED"))
+        print(f"🔀 Mixed {len(keys)} of {len(positions)} tracks")
+        self.speak(f"Playing {description}.")
+        self.play_keys(keys)
+        return True
+
     def play_random_genre(self, genre_name):
-        """Plays a random mix of a specific genre using PlayDoctor."""
+        """
+        Plays a random mix of the genre closest to genre_name, picked locally
+        or by Play Doctor. Returns False if no genre is close enough.
+        """
         import difflib
         import urllib.parse
 
@@ -1068,14 +1539,18 @@ class VoiceAssistant:
         best_match = None
         highest_score = 0.0
         
-        for g in genres:
-            score = difflib.SequenceMatcher(None, genre_name.lower(), g.lower()).ratio()
+        genre_key = search_key(genre_name)
+        for g, key in zip(genres, genres.keys if genres else []):
+            score = difflib.SequenceMatcher(None, genre_key, key).ratio()
             if score > highest_score:
                 highest_score = score
                 best_match = g
         
-        if highest_score > 0.6:
-            print(f"🎯 Matched Genre: '{best_match}' (Score: {highest_score:.2f})")
+        if highest_score <= 0.6:
+            return False
+        
+        print(f"🎯 Matched Genre: '{best_match}' (Score: {highest_score:.2f})")
+        if not self.play_mix(f"random {best_match} music", genre=best_match):
             self.speak(f"Playing random {best_match} music.")
             
             # Use PlayDoctor with Genre seed
@@ -1083,19 +1558,27 @@ class VoiceAssistant:
             encoded_genre = urllib.parse.quote(best_match)
             # PlayDoctor format: Seed=[Genre]=[Rock]
             params = f"Seed=[Genre]=[{encoded_genre}]&Action=Play"
+            self.playlist.replace()  # Stops appending an earlier album
             self.send_mcws_command("Playback/PlayDoctor", extra_params=params)
             
             # Announce what's playing
-            import time
-            time.sleep(1)
+            self.wait_for_playlist()
             self.what_is_playing_silent()
-        else:
-            self.speak(f"I couldn't find a genre named {genre_name}.")
+        return True
 
     def process_command(self, text):
         """Maps spoken text to commands."""
+        text = self.accept_command(text)
+        if text:
+            self.execute_command(text)
+
+    def accept_command(self, text):
+        """
+        Cleans up recognized text and applies the wake word and selection state.
+        Returns the command text to execute, or None if there is nothing to run.
+        """
         if not text:
-            return
+            return None
         text = text.lower().strip()
         
         # Clean up common artifacts from voice recognition
@@ -1116,7 +1599,7 @@ class VoiceAssistant:
         # When waiting for selection, don't require wake word
         if self.state == self.STATE_WAITING_SELECTION:
             self.handle_selection(text)
-            return
+            return None
 
         # Check if command mode has timed out
         if self.state == self.STATE_COMMAND_MODE:
@@ -1144,7 +1627,7 @@ class VoiceAssistant:
             
             if not detected_wake_word:
                 print(f"🤷 Ignored (no wake word): {text}")
-                return
+                return None
             
             # Clear any pending commands in the queue when wake word is detected
             if self.command_queue:
@@ -1168,19 +1651,26 @@ class VoiceAssistant:
                 self.command_mode_start = time.time()
                 self.speak("Yes?")
                 print(f"🎤 Entered command mode (5 second window)")
-                return
+                return None
         
         elif self.state == self.STATE_COMMAND_MODE:
             # In command mode, accept any command (refresh timeout)
             self.command_mode_start = time.time()
             print(f"✅ Command received in command mode: '{text}'")
 
-        # Process the command (whether from wake word or command mode)
-        
+        return text
+
+    def execute_command(self, text):
+        """Runs a command that has passed the wake word check."""
+        # A new command: the previous query never played anything
+        self.pending_resolution = None
+
         # More robust quit detection - check if quit/exit appears anywhere
         if "quit" in text or "exit" in text or "stop listening" in text:
             self.send_mcws_command("Playback/Stop")  # Stop playback before quitting
             self.speak("Goodbye.")
+            if self.resolutions:
+                self.resolutions.flush()  # The process exits without running anything else
             raise KeyboardInterrupt
 
         elif "pause" in text:
@@ -1196,24 +1686,8 @@ class VoiceAssistant:
             
         elif "play random" in text:
             try:
-                # Check if there's a genre specified
-                if text == "play random":
-                    # Generic PlayDoctor
-                    self.speak("Playing random music.")
-                    self.send_mcws_command("Playback/PlayDoctor")
-                    time.sleep(1)
-                    self.what_is_playing_silent()
-                else:
-                    # Extract genre: "play random rock" -> "rock"
-                    genre = text.replace("play random", "").strip()
-                    if genre:
-                        self.play_random_genre(genre)
-                    else:
-                        # Fallback to generic if extraction fails
-                        self.speak("Playing random music.")
-                        self.send_mcws_command("Playback/PlayDoctor")
-                        time.sleep(1)
-                        self.what_is_playing_silent()
+                # "play random", "play random rock", "play random seventies", "play random pink floyd"
+                self.play_random(text.replace("play random", "").strip())
             except Exception as e:
                 print(f"❌ Error in play random: {e}")
                 self.speak("Something went wrong playing random music.")
@@ -1222,33 +1696,30 @@ class VoiceAssistant:
             self.send_mcws_command("Playback/Play")
 
         # Check for navigation commands with various phrasings
+        # Bursts of next/previous/volume are merged by the coalescer
         elif "next track" in text or "next song" in text or text in ["next", "skip"]:
-            self.send_mcws_command("Playback/Next")
-            time.sleep(0.5)  # Give JRiver a moment to update
-            self.what_is_playing_silent()
+            self.transport.move(1)
 
         elif "previous track" in text or "previous song" in text or text in ["previous", "back"]:
-            self.send_mcws_command("Playback/Previous")
-            time.sleep(0.5)  # Give JRiver a moment to update
-            self.what_is_playing_silent()
+            self.transport.move(-1)
             
         elif "volume up" in text:
-            self.send_mcws_command("Playback/Volume", extra_params="Level=600")
+            self.transport.step_volume(1)
             
         elif "volume down" in text:
-            self.send_mcws_command("Playback/Volume", extra_params="Level=400")
+            self.transport.step_volume(-1)
 
         elif text in ["turn it off", "shut down", "stop all"]:
             self.send_mcws_command("Playback/StopAll")
             self.speak("Stopping all playback.")
 
-        elif "what is playing" in text or "what song is this" in text or "what track is this" in text or "what's playing" in text or "what song" in text or "what track" in text:
+        elif any(phrase in text for phrase in self.NOW_PLAYING_PHRASES):
             self.what_is_playing()
 
-        elif "list tracks" in text or "show tracks" in text or "show playlist" in text:
+        elif any(phrase in text for phrase in self.LIST_TRACKS_PHRASES):
             self.list_tracks()
 
-        elif "go to track" in text or "jump to track" in text or "play track" in text or "play truck" in text or "play crack" in text or "play black" in text or "play check" in text:
+        elif any(phrase in text for phrase in self.GO_TO_TRACK_PHRASES):
             # Extract track number from command
             # Only proceed if there's actually a number mentioned
             words = text.split()
@@ -1282,13 +1753,20 @@ class VoiceAssistant:
                     self.speak("Please say which track number.")
 
         # --- Explicit Search Commands ---
+        elif text.startswith(self.SONG_PREFIXES):
+            for prefix in self.SONG_PREFIXES:
+                if text.startswith(prefix):
+                    self.play_song(text[len(prefix):].strip())
+                    return
+
         elif text.startswith("play artist") or text.startswith("find artist") or text.startswith("search for artist"):
             for prefix in ["play artist", "find artist", "search for artist"]:
                 if text.startswith(prefix):
                     query = text.replace(prefix, "").strip()
                     if query:
-                        artist, a_score = self.find_best_match(query, "Artist")
-                        composer, c_score = self.find_best_match(query, "Composer")
+                        matches = self.find_best_matches(query, ("Artist", "Composer"))
+                        artist, a_score = matches["Artist"]
+                        composer, c_score = matches["Composer"]
                         
                         best = artist if a_score >= c_score else composer
                         field = "Artist" if a_score >= c_score else "Composer"
@@ -1343,14 +1821,9 @@ class VoiceAssistant:
                 
                 if query.lower() in number_words:
                     # Check if music is playing
-                    xml_response = self.send_mcws_command("Playback/Info", return_xml=True)
-                    if xml_response:
+                    info = self.playback.current()
+                    if info:
                         try:
-                            root = ET.fromstring(xml_response)
-                            info = {}
-                            for item in root.findall('Item'):
-                                info[item.get('Name')] = item.text
-                            
                             total_tracks = int(info.get('PlayingNowTracks', 0))
                             if total_tracks > 0:
                                 # Music is playing, interpret as track navigation
@@ -1368,8 +1841,72 @@ class VoiceAssistant:
         else:
             print(f"🤷 Ignored: {text}")
 
+    def library_search_query(self, text):
+        """
+        Returns the query of a generic "play X" / "search for X" command,
+        or None if the text is any other command.
+        """
+        if text.startswith("but "):
+            text = text.replace("but ", "play ", 1)
+        if text.startswith(self.EXPLICIT_SEARCH_PREFIXES) or any(phrase in text for phrase in self.GO_TO_TRACK_PHRASES):
+            return None
+        if any(word in text for word in self.TRANSPORT_WORDS):
+            return None
+        
+        for prefix in ["search for ", "play "]:
+            if text.startswith(prefix):
+                query = text[len(prefix):].strip()
+                # "play three" may be track navigation, leave it to execute_command
+                if query and not query.isdigit() and query not in ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"]:
+                    return query
+        return None
+
+    def is_library_command(self, text):
+        """
+        True if the command searches the library ("play X", "play artist X",
+        "play the song X", "play random ..."). On a cold cache these can take
+        a while, so the async pipeline runs them in the background.
+        """
+        if text.startswith("but "):
+            text = text.replace("but ", "play ", 1)
+        if any(word in text for word in ("quit", "exit", "stop", "pause")):
+            return False  # Handled first by execute_command
+        return bool(self.library_search_query(text)) or text.startswith(self.EXPLICIT_SEARCH_PREFIXES)
+
+    async def execute_command_async(self, text):
+        """
+        Async version of execute_command.
+        Commands with async implementations are awaited on the event loop,
+        everything else runs the sync handler on a worker thread.
+        """
+        # A new command: the previous query never played anything
+        self.pending_resolution = None
+        query = self.library_search_query(text)
+        if query:
+            await self.play_generic_async(query)
+        elif any(word in text for word in self.TRANSPORT_WORDS):
+            await asyncio.to_thread(self.execute_command, text)
+        elif any(phrase in text for phrase in self.NOW_PLAYING_PHRASES):
+            await self.what_is_playing_async()
+        elif any(phrase in text for phrase in self.LIST_TRACKS_PHRASES):
+            await self.list_tracks_async()
+        else:
+            await asyncio.to_thread(self.execute_command, text)
+
 # --- Main Execution ---
 
+def create_mcws_client():
+    """Creates an MCWS client from the current configuration."""
+    return MCWSClient(
+        cfg.get("JRIVER_IP"), cfg.get("JRIVER_PORT"), cfg.get("ACCESS_KEY"),
+        pool_size=cfg.get("MCWS_POOL_SIZE"),
+        timeout=cfg.get("MCWS_TIMEOUT"),
+        endpoint_timeouts=cfg.get("MCWS_ENDPOINT_TIMEOUTS"),
+        failure_threshold=cfg.get("MCWS_FAILURE_THRESHOLD"),
+        probe_interval=cfg.get("MCWS_PROBE_INTERVAL"),
+        use_json=cfg.get("MCWS_JSON"),
+    )
+
 import threading
 import queue
 
@@ -1389,6 +1926,58 @@ def command_worker(assistant, command_queue):
         finally:
             command_queue.task_done()
 
+async def async_command_worker(assistant, command_queue):
+    """
+    Asyncio command pipeline.
+    Commands that touch the library (searches, "play the song", "play random",
+    choosing an offered album) run as background tasks, one at a time, so a
+    slow search never blocks transport commands like next, pause or volume.
+    """
+    search_lock = asyncio.Lock()
+    search_tasks = set()
+
+    async def run_search(text, accept=False):
+        async with search_lock:
+            try:
+                # A choice from a list is accepted here, after the search that offered it
+                command = await asyncio.to_thread(assistant.accept_command, text) if accept else text
+                if command:
+                    await assistant.execute_command_async(command)
+            except KeyboardInterrupt:
+                os._exit(0)
+            except Exception as e:
+                print(f"Error processing command: {e}")
+
+    def start_search(text, accept=False):
+        task = asyncio.create_task(run_search(text, accept))
+        search_tasks.add(task)
+        task.add_done_callback(search_tasks.discard)
+
+    while True:
+        text = await asyncio.to_thread(command_queue.get)
+        if text is None:
+            break
+        try:
+            if assistant.state == assistant.STATE_WAITING_SELECTION:
+                start_search(text, accept=True)
+                continue
+            command = await asyncio.to_thread(assistant.accept_command, text)
+            if command and assistant.is_library_command(command):
+                start_search(command)
+            elif command:
+                await assistant.execute_command_async(command)
+        except KeyboardInterrupt:
+            # Handle quit command from worker
+            os._exit(0)
+        except Exception as e:
+            print(f"Error processing command: {e}")
+        finally:
+            command_queue.task_done()
+
+def run_async_command_worker(assistant, command_queue):
+    """Thread target running the asyncio command pipeline on its own event loop."""
+    asyncio.run(async_command_worker(assistant, command_queue))
+
 def main():
     # Check if setup is needed
     if not ACCESS_KEY:
@@ -1407,11 +1996,11 @@ def main():
         sys.exit(1)
 
     # Check JRiver connectivity
+    mcws = create_mcws_client()
     print("Checking JRiver connection...")
-    try:
-        requests.get(f"http://{JRIVER_IP}:{JRIVER_PORT}/MCWS/v1/Alive", timeout=2)
+    if mcws.alive():
         print("✅ JRiver is running.")
-    except requests.exceptions.ConnectionError:
+    else:
         print("⚠️  JRiver is not running. Attempting to launch...")
         try:
             subprocess.Popen(["mediacenter35"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -1420,13 +2009,45 @@ def main():
         except FileNotFoundError:
             print("❌ Could not launch 'mediacenter35'. Please start JRiver manually.")
             
+    assistant = VoiceAssistant(mcws=mcws)
+    
+    # Start from the on-disk library index if it is current, otherwise
+    # fetch the library while the voice model loads
+    jriver_running = mcws.alive()
+    watcher = LibraryWatcher(mcws, assistant.refresh_cache, interval=cfg.get("LIBRARY_POLL_INTERVAL"))
+    revision = watcher.get_revision() if jriver_running else None
+    index_loaded = bool(assistant.index_path) and assistant.load_index_file(revision)
+    if cfg.get("WARM_UP_CACHE") and jriver_running and not index_loaded:
+        on_done = (lambda: assistant.save_index_file(revision)) if assistant.index_path else None
+        assistant.warm_up_cache(on_done=on_done)
+    
+    # Forget remembered queries if the library changed while we weren't running
+    if assistant.resolutions:
+        assistant.resolutions.check_revision(revision)
+    
+    # Index track titles up front if asked to, otherwise on the first "play the song"
+    if cfg.get("WARM_UP_TRACK_TITLES") and jriver_running:
+        threading.Thread(target=assistant.get_track_titles, daemon=True).start()
+    
+    # Bring the local track database up to date in the background
+    if assistant.track_store and revision and assistant.track_store.revision() != revision:
+        threading.Thread(target=assistant.sync_track_store, args=(revision,), daemon=True).start()
+    
+    # Follow playback state in the background, so commands can wait for JRiver instead of sleeping
+    if jriver_running:
+        assistant.playback.start()
+    
+    # Pick up library changes (e.g. newly ripped albums) without a restart
+    if cfg.get("LIBRARY_POLL_INTERVAL") > 0 and jriver_running:
+        watcher.start()
+    
     model = vosk.Model(MODEL_PATH)
-    assistant = VoiceAssistant()
     
     # Start command processing thread
     command_queue = queue.Queue()
     assistant.command_queue = command_queue  # Give assistant access to queue for clearing
-    worker = threading.Thread(target=command_worker, args=(assistant, command_queue), daemon=True)
+    worker_target = run_async_command_worker if cfg.get("ASYNC_MODE") else command_worker
+    worker = threading.Thread(target=worker_target, args=(assistant, command_queue), daemon=True)
     worker.start()
     
     p = pyaudio.PyAudio()
@@ -1469,6 +2090,9 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        command_queue.put(None)  # Let the worker finish
+        if assistant.resolutions:
+            assistant.resolutions.flush()
         try:
             stream.stop_stream()
             stream.close()
@@ -0,0 +1,742 @@
+import os
+import re
+import sys
+import mmap
+import struct
+import heapq
+import difflib
+import tempfile
+import threading
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without it matching uses the trigram index alone
+    np = None
+
+# --- Search keys ---
+
+WORD = re.compile(r"[^\W_]+")
+# Spellings of "number" and "opus" before a catalogue number
+CANONICAL_WORDS = {"number": "no", "nr": "no", "nos": "no", "opus": "op", "opp": "op"}
+
+def search_key(value):
+    """
+    Returns the folded form of a library value used for matching: lowercase,
+    accents stripped, punctuation dropped, and "No."/"Number"/"Op."/"Opus"
+    before a number written as "no"/"op".
+    "Dvořák: Symphony No. 9 in E minor, Op. 95" -> "dvorak symphony no 9 in e minor op 95"
+    """
+    text = unicodedata.normalize("NFKD", value.casefold().replace("&", " and "))
+    text = "".join(c for c in text if not unicodedata.combining(c)).replace("'", "").replace("\u2019", "")
+    words = WORD.findall(text)
+    for i, word in enumerate(words[:-1]):
+        if word in CANONICAL_WORDS and words[i + 1][0].isdigit():
+            words[i] = CANONICAL_WORDS[word]
+    return " ".join(words)
+
+
+# --- Phonetic keys ---
+
+DIGIT_WORDS = {"0": "zero", "1": "one", "2": "two", "3": "three", "4": "four",
+               "5": "five", "6": "six", "7": "seven", "8": "eight", "9": "nine"}
+VOWELS = frozenset("aeiouy")
+
+def spelled_out(text):
+    """Returns text as plain lowercase letters: accents stripped, digits spelled out, everything else dropped."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return re.sub(r"[^a-z]", "", "".join(DIGIT_WORDS.get(c, c) for c in text))
+
+def phonetic_key(text):
+    """
+    Returns a Metaphone-style sound key: consonant classes with vowels dropped
+    after the first letter, word breaks ignored. Names that sound alike get
+    the same key, e.g. "rock man enough" and "Rachmaninoff" are both "RKNF",
+    "you too" and "U2" are both "AT".
+    """
+    word = spelled_out(text)
+    codes = []
+    i = 0
+    while i < len(word):
+        c = word[i]
+        next_c = word[i + 1] if i + 1 < len(word) else ""
+        step = 1
+        if c in VOWELS or c in "hw":
+            code = "A" if i == 0 else ""
+        elif c == "p" and next_c == "h":
+            code, step = "F", 2
+        elif c in "bp":
+            code = "P"
+        elif c in "fv":
+            code = "F"
+        elif c == "c":
+            if next_c in ("h", "k"):
+                code, step = "K", 2
+            else:
+                code = "S" if next_c in ("e", "i", "y") else "K"
+        elif c == "g":
+            if next_c == "h":
+                # "enough" vs "eight"
+                code, step = ("F" if word[i - 2:i] == "ou" else ""), 2
+            else:
+                code = "J" if next_c in ("e", "i", "y") else "K"
+        elif c in "kq":
+            code = "K"
+        elif c == "x":
+            code = "KS"
+        elif c in "sz":
+            code = "S"
+        elif c in "dt":
+            code = "T"
+        elif c in "mn":
+            code = "N"
+        elif c == "r":
+            # Dropped before consonants, as it usually is when spoken
+            code = "R" if not next_c or next_c in VOWELS else ""
+        else:
+            code = c.upper()
+        codes.append(code)
+        i += step
+    return re.sub(r"(.)\1+", r"\1", "".join(codes))
+
+
+# --- Trigram index ---
+
+def trigrams(key):
+    """Returns the set of character trigrams of a key, padded so word edges count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from character trigrams to the strings containing them.
+    Lookups only touch the posting lists of the query's trigrams, so they
+    cost about the same on a 500 value library as on a 100k value one.
+    """
+
+    def __init__(self, strings, common_fraction=0.02, min_common=1000):
+        """
+        Args:
+            strings (Sequence): Strings to index (already normalized with search_key).
+            common_fraction (float): Trigrams found in more than this fraction of the
+                strings (or min_common, whichever is larger) are only used for
+                ranking when the query has no rarer ones.
+        """
+        self.strings = strings
+        # Posting lists are filled as arrays directly, so building the index
+        # of a 100k value field doesn't go through millions of list entries
+        postings = defaultdict(lambda: array("I"))
+        self.sizes = array("I")
+        for i, string in enumerate(strings):
+            grams = trigrams(string)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = dict(postings)
+        self.common = max(min_common, int(len(strings) * common_fraction))
+
+    def _posting_lists(self, grams):
+        """Returns the posting lists of grams, rarest first."""
+        return sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+
+    def rank(self, key, k=10, shortlist=50):
+        """
+        Returns up to k (position, similarity) pairs, best first.
+        Similarity is the Dice coefficient of the trigram sets (0.0-1.0).
+        """
+        grams = trigrams(key)
+        lists = self._posting_lists(grams)
+        found = [ids for ids in lists if ids]
+        rare = [ids for ids in found if len(ids) <= self.common]
+        # Count shared trigrams using the rare ones, then score the shortlist exactly
+        counts = Counter()
+        for ids in rare or found[:1]:
+            counts.update(ids)
+        candidates = heapq.nlargest(max(k, shortlist), counts, key=counts.__getitem__)
+        scored = []
+        for i in candidates:
+            shared = len(grams & trigrams(self.strings[i]))
+            scored.append((2 * shared / (len(grams) + self.sizes[i]), i))
+        return [(i, score) for score, i in heapq.nlargest(k, scored, key=lambda s: (s[0], -s[1]))]
+
+    def containing(self, key):
+        """
+        Returns the positions of the strings containing key as a substring, in order.
+        Keys shorter than a trigram can't be narrowed down and return None.
+        """
+        if len(key) < 3:
+            return None
+        grams = {key[i:i + 3] for i in range(len(key) - 2)}
+        lists = self._posting_lists(grams)
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(ids)
+        return [i for i in sorted(candidates) if key in self.strings[i]]
+
+
+# --- Token trie ---
+
+class TokenTrie:
+    """
+    Trie over the words of search keys. Finding every key that starts a
+    query takes one walk along the query's words, however many keys there are.
+    """
+
+    END = ""  # Child name holding the items of keys that end at a node (words are never empty)
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, words, item):
+        """Adds a key, given as its words, with an item to return for it."""
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(self.END, []).append(item)
+
+    def prefixes(self, words):
+        """
+        Returns (word count, items) for every key that the words start with,
+        longest first. "gustav holst the planets" -> [(2, [<Gustav Holst>]), ...]
+        """
+        found = []
+        node = self.root
+        for count, word in enumerate(words, 1):
+            node = node.get(word)
+            if node is None:
+                break
+            if self.END in node:
+                found.append((count, node[self.END]))
+        found.reverse()
+        return found
+
+
+# --- Vectorized scoring (NumPy) ---
+
+class NgramMatrix:
+    """
+    String-by-trigram incidence matrix, stored by column: a trigram's column
+    is a NumPy view of its posting list in a TrigramIndex, so nothing is copied.
+    Scoring a query against every string is one bincount over the query's
+    columns plus a few array operations, instead of a Python loop.
+    """
+
+    def __init__(self, blocks, sizes):
+        self.blocks = blocks  # (postings, first row) per stacked TrigramIndex
+        self.sizes = sizes    # Trigram count of each row
+
+    @classmethod
+    def from_index(cls, index):
+        """Wraps a TrigramIndex."""
+        return cls([(index.postings, 0)], np.frombuffer(index.sizes, dtype=np.uint32))
+
+    @classmethod
+    def stack(cls, matrices):
+        """Stacks matrices on top of each other (rows of the first come first)."""
+        blocks, offset = [], 0
+        for matrix in matrices:
+            blocks.extend((postings, first + offset) for postings, first in matrix.blocks)
+            offset += len(matrix)
+        return cls(blocks, np.concatenate([matrix.sizes for matrix in matrices]))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def scores(self, key):
+        """Returns the Dice similarity of key's trigrams with every row (0.0-1.0)."""
+        grams = trigrams(key)
+        columns = [np.frombuffer(postings[gram], dtype=np.uint32).astype(np.int64) + first
+                   for postings, first in self.blocks for gram in grams if gram in postings]
+        if columns:
+            shared = np.bincount(np.concatenate(columns), minlength=len(self))
+        else:
+            shared = np.zeros(len(self), dtype=np.int64)
+        return 2 * shared / (len(grams) + self.sizes)
+
+    @staticmethod
+    def top(scores, k):
+        """Returns up to k (position, score) pairs with the highest scores, best first."""
+        if len(scores) > k:
+            positions = np.argpartition(-scores, k)[:k]
+        else:
+            positions = np.arange(len(scores))
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        return [(int(i), float(scores[i])) for i in positions if scores[i] > 0]
+
+
+class FieldScorer:
+    """
+    Scores one query against the values of several fields in a single pass.
+    The fields' matrices are stacked once and reused until one of the fields
+    is replaced (e.g. after a library refresh).
+    Without NumPy each field's trigram index is asked in turn.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.matrix = None
+        self.bounds = {}
+        self.lock = threading.Lock()
+
+    def rank(self, fields, key, k=10):
+        """
+        Args:
+            fields (dict): Field name -> FieldValues (with build_index done).
+            key (str): Normalized query.
+            k (int): Results per field.
+
+        Returns:
+            dict: Field name -> up to k (position, similarity) pairs, best first.
+        """
+        if np is None or any(values.matrix is None for values in fields.values()):
+            return {field: values.similar(key, k) for field, values in fields.items()}
+
+        with self.lock:
+            if self.fields.keys() != fields.keys() or any(self.fields[f] is not v for f, v in fields.items()):
+                self.matrix = NgramMatrix.stack([values.matrix for values in fields.values()])
+                self.bounds, start = {}, 0
+                for field, values in fields.items():
+                    self.bounds[field] = (start, start + len(values.matrix))
+                    start += len(values.matrix)
+                self.fields = dict(fields)
+            matrix, bounds = self.matrix, self.bounds
+
+        scores = matrix.scores(key)
+        return {field: NgramMatrix.top(scores[start:end], k) for field, (start, end) in bounds.items()}
+
+
+class FieldValues(Sequence):
+    """
+    All values of one library field plus their precomputed search keys.
+    Behaves like a read-only list of the values; keys[i] is search_key(values[i]).
+    Keys and words are interned, so values sharing them share one string.
+    """
+
+    def __init__(self, values, keys):
+        self.values = values
+        self.keys = keys
+        self.exact = None
+        self.grams = None
+        self.words = None
+        self.word_grams = None
+        self.word_values = None
+        self.token_ids = None
+        self.token_offsets = None
+        self.prefix_trie = None
+        self.sounds = None
+        self.sound_keys = None
+        self.sound_grams = None
+        self.matrix = None
+
+    @classmethod
+    def from_values(cls, values):
+        """Builds FieldValues from a plain list of strings."""
+        values = list(values)
+        return cls(values, [sys.intern(search_key(v)) for v in values])
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def build_index(self):
+        """
+        Builds the lookup structures used for matching: exact keys, a trigram
+        index over the keys (and its NumPy matrix, if available), a trigram
+        index over the distinct words, the words of each key as word numbers
+        (and a trie over them), and phonetic keys.
+        """
+        keys = [sys.intern(key) for key in self.keys]
+        exact = {}
+        word_values = {}
+        word_ids = {}
+        token_ids = array("I")
+        token_offsets = array("I", [0])
+        prefix_trie = TokenTrie()
+        sounds = defaultdict(list)
+        for i, key in enumerate(keys):
+            exact.setdefault(key, i)
+            key_words = key.split()
+            for word in key_words:
+                if word not in word_ids:
+                    word_ids[word] = len(word_ids)
+                    word_values[word] = i
+                token_ids.append(word_ids[word])
+            token_offsets.append(len(token_ids))
+            if key_words:
+                prefix_trie.add(key_words, i)
+            sounds[phonetic_key(self.values[i])].append(i)
+        words = [sys.intern(word) for word in word_values]
+        self.token_ids = token_ids
+        self.token_offsets = token_offsets
+        self.prefix_trie = prefix_trie
+        self.grams = TrigramIndex(keys)
+        if np is not None:
+            self.matrix = NgramMatrix.from_index(self.grams)
+        self.word_grams = TrigramIndex(words)
+        self.words = words
+        self.word_values = [word_values[word] for word in words]
+        self.sounds = dict(sounds)
+        self.sound_keys = list(self.sounds)
+        self.sound_grams = TrigramIndex(self.sound_keys)
+        # Set last: it marks the index as ready
+        self.exact = exact
+
+    def has_index(self):
+        """True once build_index has run. Until then lookups scan the keys."""
+        return self.exact is not None
+
+    def tokens(self, index):
+        """Returns the words of keys[index]."""
+        if not self.has_index():
+            return self.keys[index].split()
+        start, end = self.token_offsets[index], self.token_offsets[index + 1]
+        return [self.words[i] for i in self.token_ids[start:end]]
+
+    def prefixes_of(self, key):
+        """
+        Returns (position, remaining text) for every value whose key is a
+        whole-word prefix of key, longest first.
+        """
+        words = key.split()
+        if not self.has_index():
+            found = [(i, len(self.keys[i].split())) for i in range(len(self.keys))
+                     if self.keys[i] and f"{key} ".startswith(f"{self.keys[i]} ")]
+            found.sort(key=lambda match: match[1], reverse=True)
+            return [(i, " ".join(words[count:])) for i, count in found]
+        return [(i, " ".join(words[count:])) for count, positions in self.prefix_trie.prefixes(words) for i in positions]
+
+    def find_exact(self, key):
+        """Returns the position of the first value whose key is exactly key, or None."""
+        if not self.has_index():
+            return next((i for i, other in enumerate(self.keys) if other == key), None)
+        return self.exact.get(key)
+
+    def similar(self, key, k=10):
+        """Returns up to k (position, similarity) pairs of values similar to key, best first."""
+        if not self.has_index():
+            grams = trigrams(key)
+            scored = []
+            for i, other in enumerate(self.keys):
+                other_grams = trigrams(other)
+                scored.append((2 * len(grams & other_grams) / (len(grams) + len(other_grams)), -i))
+            return [(-i, score) for score, i in heapq.nlargest(k, scored) if score > 0]
+        if self.matrix is not None:
+            return NgramMatrix.top(self.matrix.scores(key), k)
+        return self.grams.rank(key, k)
+
+    def containing(self, key):
+        """Returns the positions of the values whose key contains key (None if key is too short to narrow)."""
+        if not self.has_index():
+            return [i for i, other in enumerate(self.keys) if key in other] if len(key) >= 3 else None
+        return self.grams.containing(key)
+
+    def similar_words(self, key, k=10):
+        """Returns up to k (word, value position) pairs for words similar to key, best first (none before build_index)."""
+        if not self.has_index():
+            return []
+        return [(self.words[i], self.word_values[i]) for i, _ in self.word_grams.rank(key, k)]
+
+    def sounds_like(self, text, k=10, min_similarity=0.8):
+        """
+        Returns (position, similarity) pairs of values that sound like text, best first.
+        Values with the same phonetic key are found with a hash lookup (similarity 1.0);
+        failing that, up to k values whose phonetic keys of four or more sounds
+        differ by a sound or two. A key that merely extends the other doesn't count:
+        "pink floyd the wall" is Pink Floyd plus more words, not a sound-alike.
+        """
+        key = phonetic_key(text)
+        if len(key) < 2:
+            return []
+        if not self.has_index():
+            # Same phonetic key only, until build_index has grouped them
+            return [(i, 1.0) for i, value in enumerate(self.values) if phonetic_key(value) == key][:k]
+        if key in self.sounds:
+            # All of them, the caller picks between values that sound the same
+            return [(i, 1.0) for i in self.sounds[key]]
+        if len(key) < 4:
+            return []
+        matches = []
+        for j, _ in self.sound_grams.rank(key, k):
+            sound_key = self.sound_keys[j]
+            if abs(len(sound_key) - len(key)) > 1 or key.startswith(sound_key) or sound_key.startswith(key):
+                continue
+            similarity = difflib.SequenceMatcher(None, key, sound_key).ratio()
+            if similarity >= min_similarity:
+                matches.extend((i, similarity) for i in self.sounds[sound_key])
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:k]
+
+
+class TrackTitles:
+    """
+    Compact index of every track title in the library, for "play the song ...".
+    Titles are stored once per distinct title and tracks as parallel arrays of
+    file key, title number and artist number, so a 100k track library costs a
+    few megabytes. Lookups use a trigram index over the distinct title keys.
+    """
+
+    def __init__(self, tracks):
+        """
+        Args:
+            tracks (iterable): (file key, title, artist) rows, e.g. from a bulk Files/Search.
+        """
+        title_ids = {}
+        artist_ids = {}
+        self.titles = []
+        self.keys = []
+        self.artists = []
+        self.file_keys = array("I")
+        track_titles = array("I")
+        self.track_artists = array("I")
+        for file_key, title, artist in tracks:
+            if not title or not str(file_key).isdigit():
+                continue
+            key = search_key(title)
+            if not key:
+                continue
+            title_id = title_ids.get(key)
+            if title_id is None:
+                title_id = title_ids[key] = len(self.titles)
+                self.titles.append(title)
+                self.keys.append(sys.intern(key))
+            artist = artist or ""
+            artist_id = artist_ids.get(artist)
+            if artist_id is None:
+                artist_id = artist_ids[artist] = len(self.artists)
+                self.artists.append(artist)
+            self.file_keys.append(int(file_key))
+            track_titles.append(title_id)
+            self.track_artists.append(artist_id)
+
+        # Tracks grouped by title: tracks_by_title[offsets[t]:offsets[t + 1]]
+        counts = array("I", bytes(4 * (len(self.titles) + 1)))
+        for title_id in track_titles:
+            counts[title_id + 1] += 1
+        for t in range(len(self.titles)):
+            counts[t + 1] += counts[t]
+        self.offsets = array("I", counts)
+        self.tracks_by_title = array("I", bytes(4 * len(track_titles)))
+        for track, title_id in enumerate(track_titles):
+            self.tracks_by_title[counts[title_id]] = track
+            counts[title_id] += 1
+
+        self.exact = title_ids
+        self.artist_keys = [search_key(artist) for artist in self.artists]
+        self.grams = TrigramIndex(self.keys)
+
+    def __len__(self):
+        return len(self.file_keys)
+
+    def tracks(self, title_id):
+        """Returns the track numbers with the given title."""
+        return self.tracks_by_title[self.offsets[title_id]:self.offsets[title_id + 1]]
+
+    def find(self, title, artist=None, k=5):
+        """
+        Returns up to k (title, artist, file key, similarity) matches for a
+        spoken title, best first. If artist is given, only tracks whose
+        artist contains it are returned.
+        """
+        key = search_key(title)
+        if not key:
+            return []
+        title_id = self.exact.get(key)
+        artist_key = search_key(artist) if artist else None
+        if title_id is not None:
+            ranked = [(title_id, 1.0)]
+        else:
+            # Look further down the list when the artist will filter it
+            ranked = self.grams.rank(key, k * 10 if artist_key else k)
+        matches = []
+        for title_id, score in ranked:
+            for track in self.tracks(title_id):
+                artist_id = self.track_artists[track]
+                if artist_key and artist_key not in self.artist_keys[artist_id]:
+                    continue
+                matches.append((self.titles[title_id], self.artists[artist_id], str(self.file_keys[track]), score))
+        return matches[:k]
+
+
+# --- Memory-mapped index file ---
+#
+# Layout (native byte order, sections 8-byte aligned):
+#   header:    magic, format version, byte order marker, field count
+#   revision:  length-prefixed UTF-8 library revision the file was built from
+#   directory: per field: name, value count, and positions of its four sections
+#   sections:  value offsets (uint32[count + 1]), value bytes,
+#              key offsets (uint32[count + 1]), key bytes
+
+INDEX_MAGIC = b"JRVIDX"
+INDEX_VERSION = 2
+BYTE_ORDER_MARKER = 0x01020304
+HEADER = struct.Struct("=6sHII")
+DIRECTORY_ENTRY = struct.Struct("=IQQQQ")
+LENGTH = struct.Struct("=H")
+
+
+class MappedStrings(Sequence):
+    """Read-only list of strings decoded on access from a memory-mapped blob."""
+
+    def __init__(self, buffer, offsets_pos, data_pos, count):
+        self.offsets = buffer[offsets_pos:offsets_pos + 4 * (count + 1)].cast("I")
+        self.data = buffer[data_pos:data_pos + self.offsets[count]]
+        self.count = count
+        if len(self.offsets) != count + 1 or len(self.data) != self.offsets[count]:
+            raise ValueError("truncated index file")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("index out of range")
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+
+class IndexFile:
+    """
+    Compact on-disk copy of the library field values and their search keys.
+    The file is memory-mapped read-only, so startup doesn't re-download or
+    re-parse anything and several processes share the same pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.revision = None
+        self.fields = {}
+        self._file = None
+        self._mmap = None
+
+    def open(self):
+        """
+        Maps the file. Returns False if it is missing or was written by an
+        incompatible version (it will simply be rebuilt).
+        """
+        try:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.close()
+            return False
+
+        buffer = memoryview(self._mmap)
+        try:
+            magic, version, marker, field_count = HEADER.unpack_from(buffer, 0)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION or marker != BYTE_ORDER_MARKER:
+                buffer.release()
+                self.close()
+                return False
+
+            pos = HEADER.size
+            self.revision, pos = self._read_string(buffer, pos)
+            for _ in range(field_count):
+                name, pos = self._read_string(buffer, pos)
+                count, value_offsets, values, key_offsets, keys = DIRECTORY_ENTRY.unpack_from(buffer, pos)
+                pos += DIRECTORY_ENTRY.size
+                self.fields[name] = FieldValues(
+                    MappedStrings(buffer, value_offsets, values, count),
+                    MappedStrings(buffer, key_offsets, keys, count)
+                )
+        except (struct.error, UnicodeDecodeError, TypeError, ValueError, IndexError):
+            self.fields = {}
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        """Unmaps the file (only safe once no FieldValues from it are in use)."""
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Views are still alive, the map goes away with them
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _read_string(buffer, pos):
+        (length,) = LENGTH.unpack_from(buffer, pos)
+        pos += LENGTH.size
+        return str(buffer[pos:pos + length], "utf-8"), pos + length
+
+    @staticmethod
+    def write(path, fields, revision=""):
+        """
+        Writes field values and their search keys to path.
+        The file is written next to the target and renamed into place, so
+        processes that already mapped the old file keep a consistent view.
+
+        Args:
+            path (str): Index file path.
+            fields (dict): Field name -> list of values (or FieldValues).
+            revision (str): Library revision the values belong to.
+        """
+        def encode_strings(strings):
+            offsets = array("I", [0])
+            blob = bytearray()
+            for string in strings:
+                blob += string.encode("utf-8")
+                offsets.append(len(blob))
+            return offsets.tobytes(), bytes(blob)
+
+        def align(data):
+            return data + b"\0" * (-len(data) % 8)
+
+        def encode_string(string):
+            data = string.encode("utf-8")
+            return LENGTH.pack(len(data)) + data
+
+        # Size of everything before the sections
+        names = list(fields)
+        directory_size = HEADER.size + len(encode_string(revision or ""))
+        for name in names:
+            directory_size += len(encode_string(name)) + DIRECTORY_ENTRY.size
+        pos = directory_size + (-directory_size % 8)
+
+        directory = []
+        sections = []
+        for name in names:
+            values = fields[name]
+            keys = values.keys if isinstance(values, FieldValues) else [search_key(v) for v in values]
+            positions = []
+            for offsets, blob in (encode_strings(values), encode_strings(keys)):
+                for section in (offsets, blob):
+                    positions.append(pos)
+                    section = align(section)
+                    sections.append(section)
+                    pos += len(section)
+            directory.append(encode_string(name) + DIRECTORY_ENTRY.pack(len(values), *positions))
+
+        header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, BYTE_ORDER_MARKER, len(names))
+        header += encode_string(revision or "") + b"".join(directory)
+
+        directory_name = os.path.dirname(path) or "."
+        os.makedirs(directory_name, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory_name, prefix=".library-index-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(align(header))
+                for section in sections:
+                    f.write(section)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,56 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+import requests
+
+class LibraryWatcher:
+    """
+    Polls JRiver's library revision and calls on_change when it moves.
+    The revision is a single number that changes whenever anything in the
+    library changes, so polling it is much cheaper than re-reading values.
+    """
+
+    def __init__(self, mcws, on_change, interval=60):
+        """
+        Args:
+            mcws (MCWSClient): Client used for the revision check.
+            on_change (callable): Called with the new revision (on the watcher thread) when it changes.
+            interval (float): Seconds between checks.
+        """
+        self.mcws = mcws
+        self.on_change = on_change
+        self.interval = interval
+        self.revision = None
+        self.thread = None
+
+    def get_revision(self):
+        """Returns the current library revision, or None if it can't be read."""
+        try:
+            response = self.mcws.get("Library/GetRevision")
+            root = ET.fromstring(response.content)
+        except (requests.exceptions.RequestException, ET.ParseError):
+            return None
+        item = root.find("Item[@Name='Revision']")
+        return item.text if item is not None else None
+
+    def start(self):
+        """Starts polling in a background thread."""
+        self.revision = self.get_revision()
+        if self.revision is None:
+            print("⚠️  Couldn't read the library revision, library changes won't be picked up until restart.")
+            return
+        self.thread = threading.Thread(target=self._run, daemon=True, name="library-watcher")
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            revision = self.get_revision()
+            if revision is None or revision == self.revision:
+                continue
+            print(f"📚 Library changed (revision {self.revision} -> {revision}), refreshing cache...")
+            self.revision = revision
+            try:
+                self.on_change(revision)
+            except Exception as e:
+                print(f"⚠️ Error refreshing library cache: {e}")
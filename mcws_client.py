@@ -0,0 +1,276 @@
+import time
+import random
+import asyncio
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+import requests
+from requests.adapters import HTTPAdapter
+
+# Per-endpoint timeouts (seconds). Library-wide queries can take a while on
+# big libraries, transport commands should fail fast.
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    "Alive": 2,
+    "Library/Values": 30,
+    "Files/Search": 20,
+    "Playback/Playlist": 10,
+    "Playback/Info": 3,
+    "File/GetInfo": 3,
+}
+
+def search_expression(field, value):
+    """Builds a field-scoped JRiver search expression, e.g. [Artist]=[Pink Floyd]."""
+    return f"[{field}]=[{value}]"
+
+def search_phrase_expression(field, value):
+    """Builds a JRiver search expression for values containing a phrase, e.g. [Album]="Holst"."""
+    value = value.replace('"', "")  # A quote would end the phrase
+    return f'[{field}]="{value}"'
+
+def search_params(*expressions, fields=None):
+    """
+    Builds Files/Search parameters.
+    
+    Args:
+        expressions (str): Search expressions, OR-ed together if there is more than one.
+        fields (list): Only return these fields (e.g. ["Key", "Album"]) instead of every field.
+    """
+    if len(expressions) == 1:
+        query = expressions[0]
+    else:
+        query = " or ".join(f"({expression})" for expression in expressions)
+    params = f"Query={urllib.parse.quote(query)}"
+    if fields:
+        params += f"&Fields={urllib.parse.quote(','.join(fields))}"
+    return params
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while JRiver is known to be unreachable."""
+
+
+class CircuitBreaker:
+    """
+    Tracks JRiver reachability.
+    Closed: requests go through. Open: requests fail immediately until a
+    background probe of /MCWS/v1/Alive succeeds and closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold=3):
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.is_open = False
+        self.outage_notified = False
+        self.lock = threading.Lock()
+
+    def record_success(self):
+        """Resets the failure count. Returns True if this closed an open circuit."""
+        with self.lock:
+            was_open = self.is_open
+            self.failures = 0
+            self.is_open = False
+            self.outage_notified = False
+            return was_open
+
+    def record_failure(self):
+        """Counts a connection failure. Returns True if this opened the circuit."""
+        with self.lock:
+            self.failures += 1
+            if not self.is_open and self.failures >= self.failure_threshold:
+                self.is_open = True
+                return True
+            return False
+
+    def claim_outage_notice(self):
+        """Returns True exactly once per outage, so the user is only told once."""
+        with self.lock:
+            if self.outage_notified:
+                return False
+            self.outage_notified = True
+            return True
+
+
+class MCWSClient:
+    """
+    Thin client for the JRiver Media Center Web Service (MCWS).
+    Keeps a pooled keep-alive session so repeated calls reuse the same
+    TCP connection(s) instead of opening a new one per request.
+    """
+
+    def __init__(self, host, port, access_key, pool_size=4, timeout=5,
+                 endpoint_timeouts=None, max_retries=3, failure_threshold=3,
+                 probe_interval=2, use_json=False):
+        """
+        Args:
+            host (str): JRiver host name or IP.
+            port (int): MCWS port.
+            access_key (str): Media Network access key.
+            pool_size (int): Maximum number of pooled keep-alive connections.
+            timeout (float): Default request timeout in seconds.
+            endpoint_timeouts (dict): Per-endpoint timeout overrides, e.g. {"Files/Search": 20}.
+            max_retries (int): Attempts per request before giving up.
+            failure_threshold (int): Consecutive connection failures before the circuit opens.
+            probe_interval (float): Base delay between health probes while the circuit is open.
+            use_json (bool): Ask for JSON search results, falling back to XML if JRiver can't.
+        """
+        self.base_url = f"http://{host}:{port}/MCWS/v1/"
+        self.access_key = access_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.probe_interval = probe_interval
+        self.breaker = CircuitBreaker(failure_threshold)
+        self.use_json = use_json
+        self._probe_thread = None
+        self.endpoint_timeouts = dict(DEFAULT_ENDPOINT_TIMEOUTS)
+        if endpoint_timeouts:
+            self.endpoint_timeouts.update(endpoint_timeouts)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def timeout_for(self, command_path):
+        """Returns the timeout to use for an endpoint."""
+        return self.endpoint_timeouts.get(command_path, self.timeout)
+
+    def build_url(self, command_path, extra_params=""):
+        """Builds the full MCWS URL for a command."""
+        url = f"{self.base_url}{command_path}?Zone=-1&ZoneType=ID&Key={self.access_key}"
+        if extra_params:
+            url += "&" + extra_params
+        return url
+
+    def backoff_delay(self, attempt, base=0.25, cap=2.0):
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    def get(self, command_path, extra_params="", stream=False):
+        """
+        Sends a GET request to MCWS, retrying connection errors with backoff.
+        Returns the response, or raises requests.exceptions.RequestException
+        once all retries are used up. Raises CircuitOpenError straight away
+        while JRiver is known to be unreachable.
+        With stream=True the body is left unread for incremental parsing.
+        """
+        if self.breaker.is_open:
+            raise CircuitOpenError(f"JRiver unreachable, skipped {command_path}")
+
+        url = self.build_url(command_path, extra_params)
+        timeout = self.timeout_for(command_path)
+
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.get(url, timeout=timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                print(f"⚠️ Attempt {attempt + 1}/{self.max_retries} failed: {e}")
+                if self.breaker.record_failure():
+                    print("🔌 JRiver unreachable, failing fast until it comes back.")
+                    self._start_probe()
+                    raise
+                if attempt < self.max_retries - 1:
+                    time.sleep(self.backoff_delay(attempt))
+                else:
+                    raise
+            else:
+                # Any HTTP answer means JRiver is reachable
+                self.breaker.record_success()
+                response.raise_for_status()
+                print(f"✅ Sent MCWS command: {command_path}")
+                return response
+
+    def iter_elements(self, command_path, extra_params="", tag="Item"):
+        """
+        Streams a response and yields each <tag> element as soon as it is parsed.
+        Elements are discarded once the caller moves on, so memory stays flat
+        no matter how big the response is.
+        """
+        response = self.get(command_path, extra_params, stream=True)
+        with response:
+            response.raw.decode_content = True
+            root = None
+            for event, elem in ET.iterparse(response.raw, events=("start", "end")):
+                if root is None:
+                    root = elem
+                elif event == "end" and elem.tag == tag:
+                    yield elem
+                    root.clear()
+
+    def fetch_values(self, field, page_size=10000):
+        """
+        Returns every value of a library field (Library/Values).
+        MCWS has no offset for this call, so if a page comes back full the
+        limit is doubled and the call repeated; results are never silently cut off.
+        """
+        limit = page_size
+        while True:
+            params = f"Field={urllib.parse.quote(field)}&Limit={limit}"
+            # A full page is judged by the items received, empty values included
+            items = [item.text for item in self.iter_elements("Library/Values", params)]
+            if len(items) < limit:
+                return [value for value in items if value]
+            print(f"   -> {field} has at least {limit} values, fetching more...")
+            limit *= 2
+
+    def iter_search(self, extra_params):
+        """Yields Files/Search results as dicts of field name -> value."""
+        if self.use_json:
+            try:
+                response = self.get("Files/Search", extra_params + "&Action=JSON")
+                tracks = response.json()
+            except (ValueError, requests.exceptions.HTTPError):
+                # Older MCWS versions don't support JSON output
+                print("⚠️  JRiver didn't return JSON search results, using XML.")
+                self.use_json = False
+            else:
+                for track in tracks:
+                    yield {name: str(value) for name, value in track.items()}
+                return
+
+        for item in self.iter_elements("Files/Search", extra_params):
+            yield {field.get('Name'): field.text for field in item.findall('Field')}
+
+    def _start_probe(self):
+        """Starts the background health probe if it isn't already running."""
+        if self._probe_thread and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Polls /MCWS/v1/Alive with backoff until JRiver answers, then closes the circuit."""
+        attempt = 0
+        while self.breaker.is_open:
+            time.sleep(self.probe_interval + self.backoff_delay(attempt, base=self.probe_interval, cap=30))
+            if self.alive():
+                if self.breaker.record_success():
+                    print("✅ JRiver is reachable again.")
+                return
+            attempt += 1
+
+    def alive(self):
+        """Returns True if JRiver answers on /MCWS/v1/Alive."""
+        try:
+            response = self.session.get(f"{self.base_url}Alive", timeout=self.timeout_for("Alive"))
+            return response.ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+class AsyncMCWSClient:
+    """
+    Asyncio front-end for MCWSClient.
+    Requests run on worker threads and share the sync client's connection
+    pool and circuit breaker, so independent calls can be awaited together
+    with asyncio.gather without adding another HTTP dependency.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, command_path, extra_params=""):
+        """Async version of MCWSClient.get."""
+        return await asyncio.to_thread(self.client.get, command_path, extra_params)
@@ -0,0 +1,128 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+import requests
+
+# Playback/Info "State" values
+STATE_STOPPED = 0
+STATE_PAUSED = 1
+STATE_PLAYING = 2
+
+def info_int(info, name, default=0):
+    """Returns a numeric Playback/Info item (e.g. PlayingNowTracks) as an int."""
+    try:
+        return int(info.get(name))
+    except (TypeError, ValueError):
+        return default
+
+
+class PlaybackMonitor:
+    """
+    Tracks JRiver's playback state (position, track count, file key, status)
+    with one background poller. Commands wait for the state they expect
+    ("playlist populated", "position is 4") and return as soon as JRiver gets
+    there instead of sleeping for the worst case, and read the latest state
+    instead of asking JRiver for it again.
+    Polls quickly while a command is waiting, every interval seconds while
+    music plays, and not at all while stopped until something asks.
+    """
+
+    def __init__(self, mcws, interval=5.0, fast_interval=0.2, on_error=None):
+        """
+        Args:
+            mcws (MCWSClient): Client used for Playback/Info.
+            interval (float): Seconds between checks while playing (0 = only when asked).
+            fast_interval (float): Seconds between checks while a command is waiting.
+            on_error (callable): Called with the exception when a fetch asked for by a
+                command fails (the background poller's failures are not reported).
+        """
+        self.mcws = mcws
+        self.on_error = on_error
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.info = None     # Latest Playback/Info as Name -> value
+        self.updated = None  # time.monotonic() when the request that returned info was sent
+        self.waiters = 0
+        self.condition = threading.Condition()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Starts the poller thread (once)."""
+        with self.condition:
+            if self.thread:
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True, name="playback-monitor")
+        self.thread.start()
+
+    def refresh(self, report=True):
+        """
+        Fetches Playback/Info now. Returns it as a dict, or None if it can't be read
+        (passing a failed request to on_error if report is set).
+        """
+        sent = time.monotonic()
+        try:
+            response = self.mcws.get("Playback/Info")
+            root = ET.fromstring(response.content)
+        except requests.exceptions.RequestException as e:
+            if report and self.on_error:
+                self.on_error(e)
+            return None
+        except ET.ParseError:
+            return None
+        info = {item.get('Name'): item.text for item in root.findall('Item')}
+        with self.condition:
+            # A slower request sent earlier must not overwrite a newer state
+            if self.updated is None or sent >= self.updated:
+                self.info, self.updated = info, sent
+            self.condition.notify_all()
+        return info
+
+    def cached(self, max_age=1.0):
+        """Returns the latest playback state if it is at most max_age seconds old, otherwise None (never fetches)."""
+        with self.condition:
+            if self.info is not None and time.monotonic() - self.updated <= max_age:
+                return self.info
+        return None
+
+    def current(self, max_age=1.0):
+        """Returns the playback state, fetching it only if the latest one is older than max_age seconds."""
+        return self.cached(max_age) or self.refresh()
+
+    def wait_for(self, condition, timeout=5.0):
+        """
+        Waits until a state fetched after this call satisfies condition(info).
+        Returns that state, or None if it didn't happen within timeout seconds.
+        """
+        since = time.monotonic()
+        deadline = since + timeout
+        self.start()
+        with self.condition:
+            self.waiters += 1
+        self.wake.set()  # Poll now instead of at the next idle check
+        try:
+            with self.condition:
+                while True:
+                    if self.info is not None and self.updated >= since and condition(self.info):
+                        return self.info
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+        finally:
+            with self.condition:
+                self.waiters -= 1
+
+    def _next_interval(self):
+        """Seconds until the next poll, or None to wait until woken."""
+        with self.condition:
+            if self.waiters:
+                return self.fast_interval
+            playing = self.info is not None and info_int(self.info, 'State') == STATE_PLAYING
+        return self.interval if playing and self.interval > 0 else None
+
+    def _run(self):
+        while True:
+            self.refresh(report=False)
+            self.wake.wait(self._next_interval())
+            self.wake.clear()
@@ -0,0 +1,112 @@
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+import requests
+
+# Fields kept for each Playing Now track
+PLAYLIST_FIELDS = ["Key", "Name", "Artist", "Album", "Track #", "Disc #"]
+
+def parse_serialized_keys(text):
+    """
+    Parses a serialized file list ("2;<count>;<flags>;key;key;...") into file keys.
+    Returns None if it isn't in that format.
+    """
+    parts = text.strip().split(";")
+    try:
+        count = int(parts[1])
+    except (IndexError, ValueError):
+        return None
+    if count < 0 or len(parts) < count + 2:
+        return None
+    return parts[len(parts) - count:] if count else []
+
+
+class PlayingNow:
+    """
+    Local mirror of JRiver's Playing Now list: the file keys in order and
+    the fields of each track. Playback/Info's PlayingNowChangeCounter says
+    when the list changed; only then is the key list fetched (one short
+    line), and track fields are only downloaded if it has tracks neither the
+    mirror nor the shared FileInfoCache knows, so listing tracks or saying
+    what's playing usually costs no request at all. The mirror keeps the
+    fields of its own tracks, so they survive the shared cache dropping them.
+    """
+
+    def __init__(self, mcws, tracks):
+        """
+        Args:
+            mcws (MCWSClient): Client used for Playback/Playlist.
+            tracks (FileInfoCache): Track fields by file key, shared with album searches.
+        """
+        self.mcws = mcws
+        self.keys = []
+        self.fields = {}  # File key -> fields, for the tracks in the list
+        self.tracks = tracks
+        self.counter = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sync(self, info, keys=None):
+        """
+        Brings the mirror up to date with the Playback/Info state info.
+        keys is the file key list if the caller already fetched it (see parse_serialized_keys).
+        Returns True if the mirror matches JRiver's list.
+        """
+        counter = info.get('PlayingNowChangeCounter')
+        with self.lock:
+            if counter is not None and counter == self.counter:
+                return True
+            try:
+                if keys is None:
+                    keys = self._fetch_keys()
+                fields = None if keys is None else self._known_fields(keys)
+                missing = fields is None
+                if missing:
+                    keys, fields = self._fetch_tracks()
+            except (requests.exceptions.RequestException, ET.ParseError) as e:
+                print(f"⚠️ Couldn't read the Playing Now list: {e}")
+                return False
+            self.keys = keys
+            self.fields = fields
+            self.counter = counter
+            if missing:
+                print(f"📋 Mirrored Playing Now ({len(keys)} tracks)")
+            return True
+
+    def _fetch_keys(self):
+        """Returns the file keys of Playing Now in order, or None if the serialized list isn't available."""
+        response = self.mcws.get("Playback/Playlist", "Action=Serialize")
+        return parse_serialized_keys(response.text)
+
+    def _known_fields(self, keys):
+        """Returns file key -> fields for keys from the mirror or the shared cache, or None if a track is unknown to both."""
+        fields = {}
+        for key in keys:
+            known = self.fields.get(key) or self.tracks.get(key)
+            if known is None:
+                return None
+            fields[key] = known
+        return fields
+
+    def _fetch_tracks(self):
+        """Downloads the fields of every Playing Now track. Returns the file keys in order and their fields."""
+        tracks = []
+        params = f"Fields={urllib.parse.quote(','.join(PLAYLIST_FIELDS))}"
+        for item in self.mcws.iter_elements("Playback/Playlist", params):
+            fields = {field.get('Name'): field.text for field in item.findall('Field')}
+            if fields.get('Key'):
+                tracks.append(fields)
+        self.tracks.update(tracks)
+        return [fields['Key'] for fields in tracks], {fields['Key']: fields for fields in tracks}
+
+    def track(self, key):
+        """Returns the fields of a Playing Now track by file key, or None."""
+        with self.lock:
+            return self.fields.get(key)
+
+    def entries(self):
+        """Returns the fields of every track, in playlist order."""
+        with self.lock:
+            return [self.fields.get(key) or {'Key': key} for key in self.keys]
@@ -0,0 +1,58 @@
+import threading
+
+class PlaylistBuilder:
+    """
+    Fills Playing Now with any number of tracks without one huge request.
+    The first chunk of file keys replaces Playing Now so playback starts
+    right away, and the rest is appended in chunks on a background thread.
+    Starting anything else in Playing Now stops the appending.
+    """
+
+    def __init__(self, send_command, chunk_size=200):
+        """
+        Args:
+            send_command (callable): Sends an MCWS command, same signature as
+                VoiceAssistant.send_mcws_command.
+            chunk_size (int): File keys per Playback/PlayByKey request.
+        """
+        self.send_command = send_command
+        self.chunk_size = max(1, chunk_size)
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def chunks(self, keys):
+        """Splits keys into request-sized lists."""
+        return [keys[i:i + self.chunk_size] for i in range(0, len(keys), self.chunk_size)]
+
+    def replace(self):
+        """Marks Playing Now as replaced, stopping any appends still running. Returns the new generation."""
+        with self.lock:
+            self.generation += 1
+            return self.generation
+
+    def play(self, keys):
+        """
+        Replaces Playing Now with keys, appending everything after the first
+        chunk in the background. Returns True once the first chunk is playing.
+        """
+        if not keys:
+            return False
+        generation = self.replace()
+        first, *rest = self.chunks(keys)
+        if not self.send_command("Playback/PlayByKey", extra_params=f"Key={','.join(first)}"):
+            return False
+        if rest:
+            print(f"➕ Adding the other {len(keys) - len(first)} tracks in the background...")
+            threading.Thread(target=self._append, args=(generation, rest), daemon=True, name="playlist-append").start()
+        return True
+
+    def _append(self, generation, chunks):
+        for chunk in chunks:
+            # Held while sending, so replace() waits for a chunk in flight
+            # and nothing is appended to whatever replaced this list
+            with self.lock:
+                if self.generation != generation:
+                    print("➕ Playing Now was replaced, stopped adding tracks.")
+                    return
+                if not self.send_command("Playback/PlayByKey", extra_params=f"Key={','.join(chunk)}&PlayMode=Add"):
+                    return
@@ -0,0 +1,117 @@
+import os
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+
+class ResolutionCache:
+    """
+    Remembers what spoken queries resolved to, e.g. "the wall" -> the album
+    "The Wall" and its track keys, so a repeated request can be played
+    without matching or searching again.
+    Entries are only added once something actually played, and the least
+    recently used ones are dropped beyond max_entries. Each entry records the
+    library revision it was learned at: when the library's values change
+    everything is forgotten, and entries from an older revision are checked
+    again before they are reused (see is_current). New entries are written
+    to disk a few seconds later on a background thread, several at a time.
+    """
+
+    def __init__(self, path, max_entries=500, save_delay=5.0):
+        """
+        Args:
+            path (str): JSON file the cache is kept in.
+            max_entries (int): Maximum number of remembered queries.
+            save_delay (float): Seconds between a change and writing the file.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self.revision = None
+        self.entries = OrderedDict()
+        self.dirty = False
+        self.save_timer = None
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Reads the cache file, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.revision = data.get("revision")
+            self.entries = OrderedDict(data.get("entries", []))
+        except (OSError, ValueError, TypeError, AttributeError):
+            self.revision = None
+            self.entries = OrderedDict()
+
+    def save(self):
+        """Writes the cache file (next to the target, then renamed into place)."""
+        with self.lock:
+            data = {"revision": self.revision, "entries": list(self.entries.items())}
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".resolutions-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Couldn't save query cache: {e}")
+
+    def schedule_save(self):
+        """Saves the file save_delay seconds from now, once for all changes made until then."""
+        with self.lock:
+            self.dirty = True
+            if self.save_timer is not None:
+                return
+            self.save_timer = threading.Timer(self.save_delay, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        """Saves now if there are unsaved changes (e.g. before exiting)."""
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+            dirty, self.dirty = self.dirty, False
+        if dirty:
+            self.save()
+
+    def get(self, query):
+        """Returns the entry remembered for a normalized query, or None."""
+        with self.lock:
+            entry = self.entries.get(query)
+            if entry is not None:
+                self.entries.move_to_end(query)
+            return entry
+
+    def put(self, query, entry):
+        """Remembers what a normalized query resolved to, at the current library revision."""
+        with self.lock:
+            self.entries[query] = dict(entry, revision=self.revision)
+            self.entries.move_to_end(query)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        self.schedule_save()
+
+    def is_current(self, entry):
+        """True if the entry was learned at the current library revision."""
+        return entry.get("revision") == self.revision
+
+    def check_revision(self, revision, changed=True):
+        """
+        Called with the current library revision. If it isn't the one the entries
+        were learned at, everything is forgotten, unless changed is False: the
+        library's values are the same, so the entries are kept, but they no
+        longer count as current (tracks may still have changed).
+        """
+        if revision is None or revision == self.revision:
+            return
+        with self.lock:
+            if changed and self.entries:
+                print("📚 Library changed, forgetting remembered queries.")
+                self.entries.clear()
+            self.revision = revision
+        self.schedule_save()
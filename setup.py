@@ -4,13 +4,16 @@ from setuptools import setup
 setup(
     name='jriver-voice-command',
     version='0.2.0',
-    py_modules=['jriver_voice', 'config', 'model_manager'],
+    py_modules=['jriver_voice', 'config', 'model_manager', 'mcws_client', 'command_coalescer', 'library_watcher', 'library_index', 'track_store', 'resolution_cache', 'work_catalog', 'playback_monitor', 'playing_now', 'file_info_cache', 'playlist_builder', 'shuffle_engine'],
     data_files=[('', ['config.json'])],  # Include config.json in the package
     install_requires=[
         'vosk',
         'pyaudio',
         'requests',
     ],
+    extras_require={
+        'fast': ['numpy'],  # Vectorized library matching
+    },
     entry_points={
         'console_scripts': [
             'jriver-voice=jriver_voice:main', 
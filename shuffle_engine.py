@@ -0,0 +1,134 @@
+import heapq
+import random
+import datetime
+from array import array
+from collections import deque
+from library_index import search_key
+
+# Fields a mix is chosen from
+MIX_FIELDS = ["Key", "Artist", "Album", "Genre", "Date", "Rating"]
+
+# Star rating -> how much more often a track is picked than an unrated one
+RATING_WEIGHTS = {0: 1.0, 1: 0.25, 2: 0.5, 3: 1.0, 4: 1.5, 5: 2.0}
+
+# Spoken decades -> first year ("seventies" -> 1970)
+DECADE_WORDS = {
+    "twenties": 1920, "thirties": 1930, "forties": 1940, "fifties": 1950, "sixties": 1960,
+    "seventies": 1970, "eighties": 1980, "nineties": 1990, "noughties": 2000,
+}
+
+def year_of(date):
+    """
+    Returns the year of a JRiver Date value, which is either a plain year
+    or a day count (days since 1899-12-30). Returns 0 if unknown.
+    """
+    try:
+        value = float(date)
+    except (TypeError, ValueError):
+        return 0
+    if 1000 <= value <= 3000:
+        return int(value)
+    if value > 3000:
+        try:
+            return (datetime.date(1899, 12, 30) + datetime.timedelta(days=int(value))).year
+        except OverflowError:
+            return 0
+    return 0
+
+def parse_decade(text):
+    """Returns the decade named in text ("70s", "1970s", "the seventies") as its first year, or None."""
+    for word in search_key(text).split():
+        if word in DECADE_WORDS:
+            return DECADE_WORDS[word]
+        if word.endswith("s") and word[:-1].isdigit():
+            number = int(word[:-1])
+            if number % 10 == 0 and 1900 <= number <= 2090:
+                return number
+            if number % 10 == 0 and number < 100:
+                return (1900 if number >= 20 else 2000) + number
+    return None
+
+
+class ShuffleEngine:
+    """
+    Picks random mixes locally from the library's track metadata instead of
+    asking Play Doctor. Tracks are weighted by star rating, sampled without
+    replacement, then ordered so the same artist or album doesn't come back
+    within a few tracks. The same seed always gives the same mix.
+    """
+
+    def __init__(self, tracks, artist_gap=3, album_gap=5):
+        """
+        Args:
+            tracks (iterable): Dicts of MCWS field name -> value with the MIX_FIELDS.
+            artist_gap (int): Tracks before the same artist may play again.
+            album_gap (int): Tracks before the same album may play again.
+        """
+        self.artist_gap = artist_gap
+        self.album_gap = album_gap
+        self.keys = []
+        self.names = {}  # Artist/album/genre search key -> id
+        self.artists = array("I")
+        self.albums = array("I")
+        self.genres = array("I")
+        self.years = array("H")
+        self.weights = array("f")
+        for track in tracks:
+            if not track.get("Key"):
+                continue
+            try:
+                rating = int(float(track.get("Rating") or 0))
+            except ValueError:
+                rating = 0
+            self.keys.append(track["Key"])
+            self.artists.append(self._name_id(track.get("Artist")))
+            self.albums.append(self._name_id(track.get("Album")))
+            self.genres.append(self._name_id(track.get("Genre")))
+            self.years.append(year_of(track.get("Date")))
+            self.weights.append(RATING_WEIGHTS.get(rating, 1.0))
+
+    def _name_id(self, name):
+        key = search_key(name or "")
+        name_id = self.names.get(key)
+        if name_id is None:
+            name_id = self.names[key] = len(self.names)
+        return name_id
+
+    def __len__(self):
+        return len(self.keys)
+
+    def select(self, genre=None, decade=None, artists=None):
+        """Returns the positions of the tracks matching every given filter (genre name, decade's first year, artist names)."""
+        genre_id = self.names.get(search_key(genre)) if genre else None
+        artist_ids = {self.names.get(search_key(artist)) for artist in artists} if artists else None
+        if (genre and genre_id is None) or (artist_ids is not None and artist_ids == {None}):
+            return []
+        return [
+            i for i in range(len(self.keys))
+            if (genre_id is None or self.genres[i] == genre_id)
+            and (decade is None or decade <= self.years[i] < decade + 10)
+            and (artist_ids is None or self.artists[i] in artist_ids)
+        ]
+
+    def mix(self, positions, size=100, seed=None):
+        """
+        Returns the file keys of a mix of up to size tracks from positions.
+        The same positions and seed always give the same mix.
+        """
+        rng = random.Random(seed)
+        # Weighted sample without replacement: the largest u^(1/weight) win.
+        # Twice as many as needed, so the spacing rules below have choices.
+        pool = heapq.nlargest(2 * size, positions, key=lambda i: rng.random() ** (1.0 / self.weights[i]))
+        recent_artists = deque(maxlen=self.artist_gap)
+        recent_albums = deque(maxlen=self.album_gap)
+        mix = []
+        while pool and len(mix) < size:
+            # The best sampled track that doesn't repeat a recent artist or
+            # album, or failing that the best one left
+            pick = next((j for j, i in enumerate(pool)
+                         if self.artists[i] not in recent_artists and self.albums[i] not in recent_albums), 0)
+            i = pool.pop(pick)
+            recent_artists.append(self.artists[i])
+            recent_albums.append(self.albums[i])
+            mix.append(self.keys[i])
+        return mix
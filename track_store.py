@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+from library_index import search_key
+
+# MCWS field name -> column name
+TRACK_FIELDS = {
+    "Key": "key",
+    "Name": "name",
+    "Artist": "artist",
+    "Composer": "composer",
+    "Album": "album",
+    "Track #": "track_no",
+    "Disc #": "disc_no",
+    "Genre": "genre",
+    "Date": "date",
+    "Rating": "rating",
+}
+
+# Columns added after the first release -> type, added to older databases
+ADDED_COLUMNS = {"date": "TEXT", "rating": "INTEGER"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tracks (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    artist TEXT,
+    composer TEXT,
+    album TEXT,
+    track_no INTEGER,
+    disc_no INTEGER,
+    genre TEXT,
+    date TEXT,
+    rating INTEGER
+);
+CREATE INDEX IF NOT EXISTS tracks_album ON tracks (album);
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    name, artist, composer, album, genre,
+    content='tracks', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _fts_phrase(text):
+    """Quotes text as an FTS5 phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+class TrackStore:
+    """
+    Local SQLite mirror of track metadata with a full-text index.
+    Album listings and album track order can then be answered locally
+    instead of with a Files/Search round trip to JRiver.
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        # WAL lets lookups keep reading the old data while a sync writes the new
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._add_columns()
+
+    def _add_columns(self):
+        """Adds columns missing from an older database, which then has to be synced again."""
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(tracks)")}
+        missing = [column for column in ADDED_COLUMNS if column not in existing]
+        if missing:
+            with self.db:
+                for column in missing:
+                    self.db.execute(f"ALTER TABLE tracks ADD COLUMN {column} {ADDED_COLUMNS[column]}")
+                self.db.execute("DELETE FROM meta WHERE name = 'revision'")
+
+    def revision(self):
+        """Returns the library revision the mirror was last synced to, or None."""
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'revision'").fetchone()
+        return row[0] if row else None
+
+    def is_ready(self):
+        """True once the mirror has been synced at least once."""
+        return self.revision() is not None
+
+    def sync(self, tracks, revision, batch_size=5000):
+        """
+        Replaces the mirror with the given tracks in one transaction,
+        on a separate connection so lookups are never blocked by it.
+
+        Args:
+            tracks (iterable): Dicts of MCWS field name -> value (e.g. from MCWSClient.iter_search).
+            revision (str): Library revision the tracks belong to.
+        """
+        columns = list(TRACK_FIELDS.values())
+        insert = f"INSERT OR REPLACE INTO tracks ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        db = sqlite3.connect(self.path)
+        try:
+            with db:
+                count = self._write_tracks(db, insert, tracks, batch_size)
+                db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('revision', ?)", (str(revision),))
+        finally:
+            db.close()
+        return count
+
+    def _write_tracks(self, db, insert, tracks, batch_size):
+        """Replaces all rows and rebuilds the full-text index. Returns the track count."""
+        count = 0
+        db.execute("DELETE FROM tracks")
+        batch = []
+        for track in tracks:
+            if not track.get("Key"):
+                continue
+            batch.append((
+                track["Key"], track.get("Name"), track.get("Artist"), track.get("Composer"),
+                track.get("Album"), _to_int(track.get("Track #"), None),
+                _to_int(track.get("Disc #"), 1), track.get("Genre"),
+                track.get("Date"), _to_int(track.get("Rating"), None),
+            ))
+            if len(batch) >= batch_size:
+                db.executemany(insert, batch)
+                count += len(batch)
+                batch = []
+        db.executemany(insert, batch)
+        count += len(batch)
+        db.execute("INSERT INTO tracks_fts (tracks_fts) VALUES ('rebuild')")
+        return count
+
+    def album_tracks(self, album):
+        """
+        Returns the tracks of an album sorted by disc and track number, as dicts
+        of MCWS field name -> value (Key, Name, Artist, Album, Track #, Disc #).
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT key, name, artist, album, track_no, disc_no FROM tracks WHERE album = ? "
+                "ORDER BY disc_no, CASE WHEN track_no IS NULL THEN 9999 ELSE track_no END",
+                (album,)
+            ).fetchall()
+        return [
+            {"Key": key, "Name": name, "Artist": artist, "Album": album_name,
+             "Track #": str(track_no) if track_no is not None else None, "Disc #": str(disc_no)}
+            for key, name, artist, album_name, track_no, disc_no in rows
+        ]
+
+    def track_titles(self):
+        """Returns (file key, track title, artist) for every track, for the track title index."""
+        with self.lock:
+            return self.db.execute("SELECT key, name, artist FROM tracks WHERE name IS NOT NULL").fetchall()
+
+    def mix_tracks(self):
+        """Returns every track as a dict of the mix engine's fields (Key, Artist, Album, Genre, Date, Rating)."""
+        with self.lock:
+            rows = self.db.execute("SELECT key, artist, album, genre, date, rating FROM tracks").fetchall()
+        return [
+            {"Key": key, "Artist": artist, "Album": album, "Genre": genre, "Date": date, "Rating": rating}
+            for key, artist, album, genre, date, rating in rows
+        ]
+
+    def work_titles(self):
+        """Returns (track title, album, composer) for every track, for the classical work index."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT name, album, composer FROM tracks WHERE name IS NOT NULL AND album IS NOT NULL"
+            ).fetchall()
+
+    def albums_by(self, name, fields=("Artist",), include_album_titles=False):
+        """
+        Returns the distinct albums whose tracks have name in one of fields
+        (substring of the folded search keys), optionally also albums with name in the title.
+        """
+        columns = [TRACK_FIELDS[field] for field in fields]
+        if include_album_titles:
+            columns.append("album")
+        needle = search_key(name)
+        rows = []
+        if needle:
+            # Full-text search narrows the candidates, the substring check keeps
+            # the same semantics as matching the Files/Search results did
+            match = " OR ".join(f"{column} : {_fts_phrase(name)}" for column in columns)
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT DISTINCT t.album, {', '.join('t.' + c for c in columns)} FROM tracks_fts "
+                    "JOIN tracks t ON t.rowid = tracks_fts.rowid WHERE tracks_fts MATCH ?",
+                    (match,)
+                ).fetchall()
+        if not rows:
+            # Names the full-text index can't match (e.g. "!!!", or a name inside
+            # a longer word) are found by scanning the columns themselves
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT DISTINCT album, {', '.join(columns)} FROM tracks"
+                ).fetchall()
+        if needle:
+            matches = lambda value: needle in search_key(value)
+        else:
+            # Nothing left once folded: compare the names as written
+            matches = lambda value: name.casefold() in value.casefold()
+        albums = set()
+        for album, *values in rows:
+            if album and any(value and matches(value) for value in values):
+                albums.add(album)
+        return albums
@@ -0,0 +1,233 @@
+from collections import defaultdict, namedtuple
+from library_index import search_key
+
+# Spellings of each kind of work -> the name it is indexed under
+WORK_TYPES = {
+    "symphony": "symphony", "symphonies": "symphony", "sinfonie": "symphony", "sinfonia": "symphony",
+    "concerto": "concerto", "concertos": "concerto", "concerti": "concerto", "konzert": "concerto",
+    "sonata": "sonata", "sonatas": "sonata", "sonate": "sonata",
+    "quartet": "quartet", "quartets": "quartet", "quartett": "quartet",
+    "quintet": "quintet", "quintets": "quintet",
+    "trio": "trio", "trios": "trio",
+    "suite": "suite", "suites": "suite",
+    "partita": "partita", "partitas": "partita",
+    "cantata": "cantata", "cantatas": "cantata",
+    "mass": "mass", "messe": "mass", "requiem": "requiem",
+    "overture": "overture", "serenade": "serenade", "divertimento": "divertimento",
+    "prelude": "prelude", "preludes": "prelude", "fugue": "fugue",
+    "etude": "etude", "etudes": "etude", "nocturne": "nocturne", "nocturnes": "nocturne",
+}
+
+# Catalogue prefixes -> the name they are indexed under (Op. 67, K. 467, BWV 1007, Hob. XVI:52)
+CATALOGUES = {"op": "op", "opus": "op", "k": "k", "kv": "k", "bwv": "bwv", "hob": "hob"}
+
+NOTES = {"a", "b", "c", "d", "e", "f", "g"}
+ACCIDENTALS = {"flat", "sharp"}
+MODES = {"major", "minor", "dur", "moll"}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+}
+TENS_WORDS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+              "seventy": 70, "eighty": 80, "ninety": 90}
+ROMAN = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+
+Work = namedtuple("Work", "work_type numbers catalogue key")
+Work.__doc__ = """A work parsed from a title or query, e.g. Work("symphony", ("5",), ("op 67",), "c minor")."""
+
+
+def read_number(words, i):
+    """
+    Reads a number at words[i], written as digits or spoken ("sixty seven",
+    "one hundred twenty five"). Returns (number as a string, next index), or (None, i).
+    """
+    if i < len(words) and words[i].isdigit():
+        return str(int(words[i])), i + 1
+    total, start = 0, i
+    while i < len(words):
+        word = words[i]
+        if word in TENS_WORDS:
+            total += TENS_WORDS[word]
+        elif word in NUMBER_WORDS:
+            total += NUMBER_WORDS[word]
+        elif word == "hundred" and total:
+            total *= 100
+        elif word == "and" and total and i + 1 < len(words) and (words[i + 1] in NUMBER_WORDS or words[i + 1] in TENS_WORDS):
+            pass  # "one hundred and five"
+        else:
+            break
+        i += 1
+    return (str(total), i) if i > start else (None, start)
+
+
+def read_roman(word):
+    """Returns the value of a Roman numeral (as used in Hoboken numbers), or None."""
+    if not word or any(c not in ROMAN for c in word):
+        return None
+    total = 0
+    for c, next_c in zip(word, word[1:] + " "):
+        value = ROMAN[c]
+        total += -value if next_c in ROMAN and ROMAN[next_c] > value else value
+    return total
+
+
+def parse_work(text):
+    """
+    Parses a title or query (folded with search_key) into a Work.
+    "beethoven symphony no 5 in c minor op 67" -> Work("symphony", ("5",), ("op 67",), "c minor")
+    """
+    words = text.split()
+    work_type = None
+    numbers = []
+    catalogue = []
+    key = None
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in WORK_TYPES and work_type is None:
+            work_type = WORK_TYPES[word]
+            # "symphony 5" / "symphony five"
+            number, i = read_number(words, i + 1)
+            if number:
+                numbers.append(number)
+            continue
+        if word in ("no", "nos", "number", "numbers") and not numbers:
+            number, i = read_number(words, i + 1)
+            # "nos 5 and 7"
+            while number:
+                numbers.append(number)
+                if i < len(words) and words[i] == "and":
+                    number, i = read_number(words, i + 1)
+                else:
+                    number = None
+            continue
+        if word in CATALOGUES:
+            prefix = CATALOGUES[word]
+            if prefix == "hob":
+                # Hob. XVI:52 -> "hob xvi 52"
+                group = read_roman(words[i + 1]) if i + 1 < len(words) else None
+                number, j = read_number(words, i + 2)
+                if group and number:
+                    catalogue.append(f"hob {group} {number}")
+                    i = j
+                    continue
+            else:
+                number, j = read_number(words, i + 1)
+                if number:
+                    catalogue.append(f"{prefix} {number}")
+                    i = j
+                    continue
+        if word in NOTES and key is None:
+            # "c minor", "e flat major"
+            j = i + 1
+            accidental = ""
+            if j < len(words) and words[j] in ACCIDENTALS:
+                accidental = " " + words[j]
+                j += 1
+            if j < len(words) and words[j] in MODES:
+                mode = "major" if words[j] == "dur" else "minor" if words[j] == "moll" else words[j]
+                key = f"{word}{accidental} {mode}"
+                i = j + 1
+                continue
+        i += 1
+    return Work(work_type, tuple(numbers), tuple(catalogue), key)
+
+
+class WorkCatalog:
+    """
+    Index of the classical works in the library, parsed from album titles
+    (and track titles, which name the work on "complete symphonies" sets).
+    "Beethoven symphony no. 5" is answered with a few dictionary lookups by
+    work number, catalogue number, composer and key instead of a scan of
+    every album title.
+    """
+
+    def __init__(self, albums, tracks=()):
+        """
+        Args:
+            albums (iterable): Album titles, e.g. "Beethoven: Symphony No. 5 in C minor, Op. 67".
+            tracks (iterable): (track title, album, composer) rows from the track database.
+        """
+        self.albums = []
+        self.album_ids = {}
+        self.by_number = defaultdict(set)     # (work type, number) -> album ids
+        self.by_catalogue = defaultdict(set)  # "op 67" -> album ids
+        self.by_type = defaultdict(set)       # work type -> album ids
+        self.by_composer = defaultdict(set)   # composer name word -> album ids
+        self.keys = defaultdict(set)          # album id -> musical keys
+        self.with_composer = set()            # album ids whose composer is known
+
+        for album in albums:
+            self.add(album, album)
+        for title, album, composer in tracks:
+            if title and album:
+                self.add(title, album, composer)
+
+    def add(self, title, album, composer=None):
+        """Indexes the work named in title as part of album."""
+        # "Beethoven: Symphony No. 5" names the composer before the colon
+        prefix, _, rest = title.partition(":")
+        work = parse_work(search_key(title))
+        if not work.work_type and not work.catalogue:
+            return
+
+        album_id = self.album_ids.get(album)
+        if album_id is None:
+            album_id = self.album_ids[album] = len(self.albums)
+            self.albums.append(album)
+
+        if work.work_type:
+            self.by_type[work.work_type].add(album_id)
+            for number in work.numbers:
+                self.by_number[(work.work_type, number)].add(album_id)
+        for catalogue in work.catalogue:
+            self.by_catalogue[catalogue].add(album_id)
+        if work.key:
+            self.keys[album_id].add(work.key)
+
+        names = [composer] if composer else []
+        if rest and not parse_work(search_key(prefix)).work_type:
+            names.append(prefix)
+        for name in names:
+            for word in search_key(name).split():
+                if len(word) > 2:
+                    self.by_composer[word].add(album_id)
+                    self.with_composer.add(album_id)
+
+    def __len__(self):
+        return len(self.albums)
+
+    def find(self, query):
+        """
+        Returns the albums holding the work described by a (folded) query,
+        sorted by title. Returns an empty list if the query doesn't name a
+        work precisely enough (e.g. just "symphony").
+        """
+        work = parse_work(query)
+        composer_ids = set()
+        for word in query.split():
+            if word in self.by_composer and word not in WORK_TYPES:
+                composer_ids |= self.by_composer[word]
+
+        candidates = None
+        if work.catalogue:
+            candidates = set().union(*(self.by_catalogue.get(c, set()) for c in work.catalogue))
+        if work.work_type and work.numbers:
+            numbered = set().union(*(self.by_number.get((work.work_type, n), set()) for n in work.numbers))
+            # A catalogue number is the more specific of the two
+            candidates = numbered if candidates is None else (candidates & numbered or candidates)
+        if candidates is None and work.work_type and composer_ids:
+            candidates = set(self.by_type.get(work.work_type, set()))
+        if not candidates:
+            return []
+
+        if composer_ids:
+            # Albums by that composer, or failing that ones whose composer is unknown
+            candidates = (candidates & composer_ids) or (candidates - self.with_composer)
+        if work.key:
+            candidates = {i for i in candidates if work.key in self.keys.get(i, ())} or candidates
+        return sorted(self.albums[i] for i in candidates)